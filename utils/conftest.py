@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+from utils.jadualbench import synthetic_tenant
+
+
+def tenant_frame(duty_index, duties_by_shift):
+    """tenant DataFrame holding the duty metadata of a synthetic DutyIndex, one row per (date, slot)"""
+    shift_of = {duty: shift for shift, duties in duties_by_shift.items() for duty in duties}
+    rows = []
+    for (d, s), slot_type in duty_index.slot_types.items():
+        min_staff, max_staff = duty_index.staff.get((d, s), (None, None))
+        rows.append({
+            'date': d,
+            'id': s,
+            'type': slot_type,
+            'role_id': duty_index.role(d, s),
+            'shift_id': shift_of.get(s),
+            'min_staff': min_staff,
+            'max_staff': max_staff,
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def make_tenant():
+    """(model kwargs, duties_by_shift) of a synthetic ward, its duty metadata read from the tenant DataFrame"""
+    def make(num_workers=10, num_days=7, **tenant_options):
+        kwargs, duties_by_shift, duty_index = synthetic_tenant(num_workers, num_days, **tenant_options)
+        kwargs['df'] = tenant_frame(duty_index, duties_by_shift)
+        return kwargs, duties_by_shift
+    return make
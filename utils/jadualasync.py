@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from utils.jadualbatch import RosterJob, run_job, split_cores
+import asyncio
+import itertools
+import os
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class RosterSolve():
+    """one RosterJob handed to the service executor, cancel stops it cooperatively"""
+
+    def __init__(self, job):
+        self.job = job
+        self.jadual = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        """stop the solve: a build in progress skips the search, a running search returns at once"""
+        with self.lock:
+            self.cancelled = True
+            jadual = self.jadual
+        if jadual is not None:
+            jadual.stop_search()
+
+    def attach(self, jadual):
+        with self.lock:
+            self.jadual = jadual
+            if self.cancelled:
+                jadual.stop_search()
+
+    def run(self, num_search_workers, submitted_at):
+        """build and solve through run_job, as solve_batch does, runs in an executor thread"""
+        return run_job(self.job, num_search_workers, submitted_at, on_model=self.attach)
+
+
+class AsyncRosterService():
+    """Asyncio front end for roster generation.
+
+    Model construction and CpSolver.Solve run in a thread pool, the CP-SAT search
+    releases the GIL, so the event loop stays responsive while rosters are built and
+    solved. total_cores (default: every core of the machine) is split as in solve_batch:
+    at most max_concurrent solves run at once, each with its share of the cores as
+    num_search_workers, and further calls wait for a free slot. Cancelling the awaiting
+    task, e.g. when the client disconnects, stops the search through StopSearch; the slot
+    is released once the solver has returned, so a cancelled solve never overlaps the
+    next one.
+    """
+
+    def __init__(self, max_concurrent=None, total_cores=None):
+        total_cores = total_cores or os.cpu_count() or 1
+        self.max_concurrent, self.num_search_workers = split_cores(max_concurrent or total_cores, max_concurrent, total_cores)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        # created in the running loop on first use
+        self.slots = None
+        self.job_ids = itertools.count()
+        log.info(f'roster service solving {self.max_concurrent} at a time with {self.num_search_workers} search workers each')
+
+    async def run(self, model_kwargs, method='default_model', method_kwargs=None, job_id=None):
+        """build and solve one roster, returns its JobResult. method is 'default_model' or
+        'use_selected_roster_model', method_kwargs its arguments"""
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_concurrent)
+        job_id = str(next(self.job_ids)) if job_id is None else job_id
+        solve = RosterSolve(RosterJob(job_id, model_kwargs, method, method_kwargs or {}))
+        submitted_at = time.time()
+        # cancelled while queued: nothing was started, the CancelledError propagates from here
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, solve.run, self.num_search_workers, submitted_at)
+            try:
+                outcome = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                log.info(f'roster job {job_id} cancelled, stopping the search')
+                solve.cancel()
+                # hold the slot until the executor thread is free again
+                await asyncio.wait([future])
+                raise
+        if outcome.error:
+            log.info(f'roster job {job_id} failed')
+        return outcome
+
+    async def default_model(self, model_kwargs, **method_kwargs):
+        """awaitable JadualModel(**model_kwargs).default_model(**method_kwargs)"""
+        return await self.run(model_kwargs, 'default_model', method_kwargs)
+
+    async def use_selected_roster_model(self, model_kwargs, **method_kwargs):
+        """awaitable JadualModel(**model_kwargs).use_selected_roster_model(**method_kwargs)"""
+        return await self.run(model_kwargs, 'use_selected_roster_model', method_kwargs)
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
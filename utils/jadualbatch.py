@@ -0,0 +1,112 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from utils.jadualortools import JadualModel
+import os
+import time
+import traceback
+import logging
+
+log = logging.getLogger(__name__)
+
+BATCH_EXECUTORS = ('process', 'thread')
+
+
+@dataclass
+class RosterJob:
+    """one roster to generate: the JadualModel constructor arguments and the model entry point to run.
+    method is 'default_model' or 'use_selected_roster_model', method_kwargs its arguments"""
+    job_id: str
+    model_kwargs: dict
+    method: str = 'default_model'
+    method_kwargs: dict = field(default_factory=dict)
+
+
+@dataclass
+class JobResult:
+    """outcome of a RosterJob, payload is the lambda payload or None if the job raised"""
+    job_id: str
+    tenant_id: str = None
+    status: str = None
+    objective: float = None
+    payload: str = None
+    result: object = None
+    request_list: list = field(default_factory=list)
+    num_search_workers: int = None
+    queued_time: float = 0.0
+    run_time: float = 0.0
+    error: str = None
+
+
+def split_cores(num_jobs, max_concurrent=None, total_cores=None):
+    """(concurrent solves, num_search_workers per solve) sharing total_cores between the jobs"""
+    if max_concurrent is not None and max_concurrent < 1:
+        raise ValueError(f'max_concurrent must be at least 1, got {max_concurrent}')
+    total_cores = total_cores or os.cpu_count() or 1
+    concurrent = min(max_concurrent or total_cores, num_jobs, total_cores)
+    concurrent = max(concurrent, 1)
+    return concurrent, max(total_cores // concurrent, 1)
+
+
+def run_job(job, num_search_workers, submitted_at, on_model=None):
+    """build and solve a single job, runs inside the pool worker. on_model, if given, is called with
+    the JadualModel before it is built, e.g. to keep a handle for stop_search"""
+    started = time.time()
+    outcome = JobResult(job.job_id, job.model_kwargs.get('tenant_id'), num_search_workers=num_search_workers)
+    outcome.queued_time = started - submitted_at
+    try:
+        method_kwargs = dict(job.method_kwargs)
+        solver_parameters = dict(method_kwargs.get('solver_parameters') or {})
+        solver_parameters['num_search_workers'] = num_search_workers
+        method_kwargs['solver_parameters'] = solver_parameters
+
+        jadual = JadualModel(**job.model_kwargs)
+        if on_model is not None:
+            on_model(jadual)
+        outcome.payload = getattr(jadual, job.method)(**method_kwargs)
+        result = jadual.get_result()
+        outcome.result = result
+        outcome.request_list = list(jadual.request_list)
+        outcome.status = result.status
+        outcome.objective = result.objective
+    except Exception:
+        outcome.error = traceback.format_exc()
+    outcome.run_time = time.time() - started
+    return outcome
+
+
+def solve_batch(jobs, max_concurrent=None, total_cores=None, executor='process'):
+    """Generate many rosters in a bounded pool and yield a JobResult as each job finishes.
+
+    total_cores (default: every core of the machine) is split between max_concurrent
+    solves, and each solve runs with the remaining share as num_search_workers, so the
+    pool never oversubscribes the machine. Processes sidestep the GIL during the Python
+    model build, threads avoid pickling the jobs and still overlap the CP-SAT searches,
+    which release the GIL. The arguments are checked when called, the jobs only start
+    once the returned iterator is consumed.
+    """
+    if executor not in BATCH_EXECUTORS:
+        raise ValueError(f'unknown executor {executor}, expected one of {BATCH_EXECUTORS}')
+    jobs = list(jobs)
+    concurrent, num_search_workers = split_cores(len(jobs), max_concurrent, total_cores)
+    if not jobs:
+        return iter(())
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    return _solve_batch(jobs, pool_class, concurrent, num_search_workers)
+
+
+def _solve_batch(jobs, pool_class, concurrent, num_search_workers):
+    log.info(f'solving {len(jobs)} rosters, {concurrent} at a time with {num_search_workers} search workers each')
+    with pool_class(max_workers=concurrent) as pool:
+        futures = {
+            pool.submit(run_job, job, num_search_workers, time.time()): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                outcome = future.result()
+            except Exception:
+                # the worker process died or the job could not be pickled
+                outcome = JobResult(futures[future].job_id, futures[future].model_kwargs.get('tenant_id'), error=traceback.format_exc())
+            if outcome.error:
+                log.info(f'roster job {outcome.job_id} failed')
+            yield outcome
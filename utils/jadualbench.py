@@ -0,0 +1,433 @@
+from ortools.sat.python import cp_model
+from utils.jadualortools import SEQUENCE_ENCODINGS, JadualModel, DutyIndex
+import pandas as pd
+import argparse
+import datetime
+import platform
+import random
+import time
+import json
+import os
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def model_size(model):
+    """returns the number of variables and constraints of a cp_model"""
+    proto = model.Proto()
+    return len(proto.variables), len(proto.constraints)
+
+
+# ------------------------------------------------------------------------------------------------------------
+#  Sequence constraint encodings
+# ------------------------------------------------------------------------------------------------------------
+
+def build_sequence_model(encoding, num_workers, num_days, sequence, min_cover, seed=0):
+    """builds a small night-shift style model: every day needs min_cover workers on the slot,
+    each worker's run of consecutive days follows the sequence constraint and random
+    requests make the objective non trivial"""
+    rng = random.Random(seed)
+    model = cp_model.CpModel()
+    add_sequence_constraint = SEQUENCE_ENCODINGS[encoding]
+    works = [[model.NewBoolVar(f'work_{w}_{d}') for d in range(num_days)] for w in range(num_workers)]
+    obj_vars = []
+    obj_coeffs = []
+    for d in range(num_days):
+        model.Add(sum(works[w][d] for w in range(num_workers)) >= min_cover)
+    for w in range(num_workers):
+        variables, coeffs = add_sequence_constraint(model, works[w], *sequence, f'sequence({w})')
+        obj_vars.extend(variables)
+        obj_coeffs.extend(coeffs)
+        for d in rng.sample(range(num_days), max(1, num_days // 7)):
+            obj_vars.append(works[w][d])
+            obj_coeffs.append(rng.choice([-3, 2]))
+    model.Minimize(sum(var * coeff for var, coeff in zip(obj_vars, obj_coeffs)))
+    return model
+
+
+def benchmark_sequence_encodings(
+    horizons=(14, 28, 56),
+    num_workers=12,
+    sequence=(2, 3, 4, 4, 6, 6),
+    min_cover=3,
+    time_limit=30.0,
+    num_search_workers=8,
+):
+    """compares model size and solve time of every SEQUENCE_ENCODINGS entry.
+    sequence is (hard_min, soft_min, min_cost, soft_max, hard_max, max_cost)"""
+    rows = []
+    for num_days in horizons:
+        for encoding in SEQUENCE_ENCODINGS:
+            start = time.perf_counter()
+            model = build_sequence_model(encoding, num_workers, num_days, sequence, min_cover)
+            build_time = time.perf_counter() - start
+            num_variables, num_constraints = model_size(model)
+
+            solver = cp_model.CpSolver()
+            solver.parameters.max_time_in_seconds = time_limit
+            solver.parameters.num_search_workers = num_search_workers
+            status = solver.Solve(model)
+            rows.append({
+                'encoding': encoding,
+                'num_days': num_days,
+                'num_workers': num_workers,
+                'variables': num_variables,
+                'constraints': num_constraints,
+                'build_time': build_time,
+                'solve_time': solver.WallTime(),
+                'status': solver.StatusName(status),
+                'objective': solver.ObjectiveValue() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
+            })
+    return rows
+
+
+# ------------------------------------------------------------------------------------------------------------
+#  Payload request annotation
+# ------------------------------------------------------------------------------------------------------------
+
+def legacy_annotate_requests(jadual, roster):
+    """row by row request annotation lambda_payload used before annotate_requests, kept as a reference"""
+    roster['requested'] = roster.apply(lambda x: jadual.check_requested(x['worker_id'], x['start'], x['id']), axis=1)
+    roster['start'] = roster['start'].apply(lambda x: x.strftime('%Y-%m-%d'))
+    roster['end'] = roster['end'].apply(lambda x: x.strftime('%Y-%m-%d'))
+    roster["id"] = roster.apply(lambda x: jadual.get_request_id(x["id"], x["start"], x["worker_id"]), axis=1)
+    return roster
+
+
+def synthetic_payload_roster(num_workers, num_days, num_duties, num_requests, seed=0):
+    """builds an exploded roster frame plus a JadualModel holding matching requests"""
+    rng = random.Random(seed)
+    workers = [f'worker_{w}' for w in range(num_workers)]
+    duties = [f'duty_{s}' for s in range(num_duties)]
+    start = datetime.date(2023, 1, 2)
+    dates = [start + datetime.timedelta(days=d) for d in range(num_days)]
+    rows = []
+    for d in dates:
+        for s in duties:
+            for w in rng.sample(workers, max(1, num_workers // num_duties)):
+                rows.append({'id': s, 'start': pd.Timestamp(d), 'end': pd.Timestamp(d), 'worker_id': w})
+    roster = pd.DataFrame(rows)
+
+    requests = []
+    request_list = []
+    for r in range(num_requests):
+        row = rows[rng.randrange(len(rows))]
+        day = row['start'].date()
+        requests.append({'id': f'request_{r}', 'date': day.strftime('%Y-%m-%d'), 'workerId': row['worker_id']})
+        request_list.append((row['worker_id'], day, row['id']))
+
+    jadual = JadualModel(
+        workers, {}, requests, dates, {d: duties for d in dates}, duties, [], {d: [] for d in dates},
+        None, [], {'id': None}, [], 'benchmark', [], []
+    )
+    jadual.request_list = request_list
+    return jadual, roster
+
+
+def benchmark_payload_annotation(sizes=((50, 30, 6, 200), (150, 31, 10, 600), (300, 90, 12, 2000))):
+    """times legacy_annotate_requests against JadualModel.annotate_requests and checks they agree.
+    sizes are (num_workers, num_days, num_duties, num_requests)"""
+    rows = []
+    for num_workers, num_days, num_duties, num_requests in sizes:
+        jadual, roster = synthetic_payload_roster(num_workers, num_days, num_duties, num_requests)
+
+        start = time.perf_counter()
+        legacy = legacy_annotate_requests(jadual, roster.copy())
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectorised = jadual.annotate_requests(roster.copy())
+        vectorised_time = time.perf_counter() - start
+
+        rows.append({
+            'num_workers': num_workers,
+            'num_days': num_days,
+            'rows': len(roster),
+            'requests': num_requests,
+            'legacy_time': legacy_time,
+            'vectorised_time': vectorised_time,
+            'identical': legacy.to_json(orient='records') == vectorised.to_json(orient='records'),
+        })
+    return rows
+
+
+# ------------------------------------------------------------------------------------------------------------
+#  Warm start
+# ------------------------------------------------------------------------------------------------------------
+
+def benchmark_solution_hints(build_model, hint_roster=None):
+    """solves a model cold, then a fresh copy hinted from hint_roster or from the cold solution, and reports
+    time to first feasible and total solve time of both. build_model() must return a built, unsolved JadualModel"""
+    rows = []
+    for hinted in (False, True):
+        jadual = build_model()
+        if hinted:
+            jadual.add_solution_hints(hint_roster, hint_last_solution=hint_roster is None)
+        result = jadual.solve()
+        rows.append({
+            'hint_source': result.hint_source,
+            'status': result.status,
+            'objective': result.objective,
+            'first_solution_time': result.first_solution_time,
+            'solve_time': result.wall_time,
+            'num_solutions': result.num_solutions,
+        })
+    cold, warm = rows
+    if cold['first_solution_time'] is not None and warm['first_solution_time'] is not None:
+        warm['first_solution_saved'] = cold['first_solution_time'] - warm['first_solution_time']
+    warm['solve_time_saved'] = cold['solve_time'] - warm['solve_time']
+    return rows
+
+
+# ------------------------------------------------------------------------------------------------------------
+#  Synthetic tenants and scaling suite
+# ------------------------------------------------------------------------------------------------------------
+
+SCALING_GRID = ((25, 14), (50, 31), (100, 31), (100, 90), (300, 31), (300, 90))
+SHIFTS = ('S_AM', 'S_PM', 'S_N')
+
+
+def synthetic_tenant(
+    num_workers,
+    num_days,
+    num_roles=2,
+    num_leave_types=2,
+    requests_per_worker=0.5,
+    sequence_encoding='SPAN',
+    seed=0,
+):
+    """generates every JadualModel input for a synthetic ward: workers split over roles, one duty per
+    (shift, role) on each date, leave types including the off day, transition rules, weekly sum and night
+    sequence constraints, requests and a prior roster. returns (model kwargs, duties_by_shift, duty_index)"""
+    rng = random.Random(seed)
+    start = datetime.date(2023, 1, 2)
+    date_list = [start + datetime.timedelta(days=d) for d in range(num_days)]
+    roles = [f'role_{r}' for r in range(num_roles)]
+    workers = [f'worker_{w}' for w in range(num_workers)]
+    workers_roles = {w: [roles[i % num_roles]] for i, w in enumerate(workers)}
+    duties_by_shift = {shift: [f'{shift}_{role}' for role in roles] for shift in SHIFTS}
+    duty_types = [duty for duties in duties_by_shift.values() for duty in duties]
+    off_day_id = 'OFF'
+    leave_types = [off_day_id] + [f'LEAVE_{l}' for l in range(num_leave_types - 1)]
+
+    workers_per_role = max(1, num_workers // num_roles)
+    min_staff = max(1, workers_per_role // 6)
+    max_staff = max(min_staff, workers_per_role // 3)
+    roles_metadata, staff, slot_types = {}, {}, {}
+    for d in date_list:
+        for shift, duties in duties_by_shift.items():
+            for role, duty in zip(roles, duties):
+                roles_metadata[(d, duty)] = role
+                staff[(d, duty)] = (min_staff, max_staff)
+                slot_types[(d, duty)] = 'Duty'
+        for leave in leave_types:
+            slot_types[(d, leave)] = 'Leave'
+    duty_index = DutyIndex.from_metadata(roles_metadata, staff, slot_types, duties_by_shift)
+
+    transition_rules = [
+        {'sequence': [{'type': 'Shift', 'id': 'S_N', 'day': 0}, {'type': 'Shift', 'id': 'S_AM', 'day': 1}],
+         'cost': 0, 'strategy': 'never'},
+        {'sequence': [{'type': 'Shift', 'id': 'S_N', 'day': 0}, {'type': 'Leave', 'id': off_day_id, 'day': 1}],
+         'cost': 10, 'strategy': 'min'},
+        {'sequence': [{'type': 'Shift', 'id': 'S_PM', 'day': 0}, {'type': 'Shift', 'id': 'S_AM', 'day': 1}],
+         'cost': 4, 'strategy': 'min'},
+    ]
+    sum_constraints = [
+        {'slotId': 'S_N', 'slotType': 'Shift', 'type': 'WEEK',
+         'hardMin': 0, 'softMin': 0, 'minCost': 0, 'softMax': 2, 'hardMax': 4, 'maxCost': 5},
+    ]
+    sequence_constraints = [
+        {'slotId': 'S_N', 'slotType': 'Shift', 'encoding': sequence_encoding,
+         'hardMin': 1, 'softMin': 2, 'minCost': 4, 'softMax': 3, 'hardMax': 4, 'maxCost': 6},
+    ]
+
+    requests = []
+    for r in range(int(num_workers * requests_per_worker)):
+        worker = rng.choice(workers)
+        day = rng.choice(date_list)
+        request = {'id': f'request_{r}', 'workerId': worker, 'date': day.isoformat(),
+                   'strategy': rng.choice(['AFFIRM', 'NEGATE'])}
+        kind = rng.random()
+        if kind < 0.5:
+            request.update(type='Leave', leaveId=rng.choice(leave_types))
+        elif kind < 0.8:
+            duty = rng.choice(duties_by_shift[rng.choice(SHIFTS)])
+            request.update(type='Duty', dutyId=duty.rsplit('_', 2)[0] + '_' + workers_roles[worker][0])
+        else:
+            request.update(type='Shift', shiftId=rng.choice(SHIFTS), strategy='AFFIRM')
+        requests.append(request)
+
+    prior_timeslots = []
+    for worker in workers:
+        if rng.random() < 0.2:
+            prior_timeslots.append({'workerId': worker, 'start': (start - datetime.timedelta(days=1)).isoformat(),
+                                    'type': 'Duty', 'dutyId': f'S_N_{workers_roles[worker][0]}'})
+
+    kwargs = dict(
+        workers_list=workers,
+        workers_roles=workers_roles,
+        requests_data=requests,
+        date_list=date_list,
+        duty_id_for_dates={d: list(duty_types) for d in date_list},
+        duty_types=duty_types,
+        leave_types=leave_types,
+        leaves_id_for_dates={d: list(leave_types) for d in date_list},
+        df=None,
+        transition_rules=transition_rules,
+        off_day={'id': off_day_id, 'daily': True, 'weekend': False, 'weekday': False},
+        off_day_date_list=date_list,
+        tenant_id=f'synthetic_{num_workers}x{num_days}',
+        sum_constraints=sum_constraints,
+        sequence_constraints=sequence_constraints,
+        prior_timeslots=prior_timeslots,
+    )
+    return kwargs, duties_by_shift, duty_index
+
+
+def build_synthetic_model(num_workers, num_days, solver_profile='interactive', solver_parameters=None, **tenant_options):
+    """builds, but does not solve, a JadualModel for a synthetic tenant"""
+    kwargs, duties_by_shift, duty_index = synthetic_tenant(num_workers, num_days, **tenant_options)
+    jadual = JadualModel(**kwargs)
+    jadual.duty_index = duty_index
+    jadual.apply_solver_profile(solver_profile, solver_parameters)
+    jadual.build_default_model([], duties_by_shift, min_off_day=0, max_off_day=2)
+    return jadual
+
+
+def payload_frame(jadual):
+    """exploded roster frame of the solved schedule, the shape lambda_payload annotates"""
+    rows = []
+    for day, slots in jadual.schedule_data.items():
+        for slot, workers in slots.items():
+            for worker in workers or [None]:
+                rows.append({'id': slot, 'start': pd.Timestamp(day), 'end': pd.Timestamp(day), 'worker_id': worker})
+    return pd.DataFrame(rows, columns=['id', 'start', 'end', 'worker_id'])
+
+
+def benchmark_scaling(grid=SCALING_GRID, time_limit=60.0, num_search_workers=8, **tenant_options):
+    """measures model build time, model size, time to first solution, final objective and payload time of
+    synthetic tenants for every (num_workers, num_days) in grid"""
+    rows = []
+    for num_workers, num_days in grid:
+        log.info(f'benchmarking {num_workers} workers x {num_days} days')
+        start = time.perf_counter()
+        jadual = build_synthetic_model(
+            num_workers,
+            num_days,
+            solver_parameters={'max_time_in_seconds': time_limit, 'num_search_workers': num_search_workers},
+            **tenant_options,
+        )
+        build_time = time.perf_counter() - start
+        num_variables, num_constraints = model_size(jadual.model)
+
+        result = jadual.solve()
+        jadual.populate_solved_data()
+
+        payload_time = None
+        if result.has_solution:
+            start = time.perf_counter()
+            jadual.annotate_requests(payload_frame(jadual))
+            payload_time = time.perf_counter() - start
+
+        rows.append({
+            'num_workers': num_workers,
+            'num_days': num_days,
+            'build_time': build_time,
+            'variables': num_variables,
+            'constraints': num_constraints,
+            'objective_terms': result.build_profile['totals']['objective_terms'],
+            'status': result.status,
+            'first_solution_time': result.first_solution_time,
+            'solve_time': result.wall_time,
+            'objective': result.objective,
+            'best_bound': result.best_bound,
+            'payload_time': payload_time,
+        })
+    return rows
+
+
+def write_baseline(rows, path):
+    """stores benchmark rows with the environment they were measured in, for later offline comparison"""
+    import ortools
+    baseline = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'ortools': ortools.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'rows': rows,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, default=str)
+    return baseline
+
+
+def compare_to_baseline(rows, path, tolerance=0.2):
+    """rows whose build, first solution, solve or payload time grew by more than tolerance, or whose model
+    size or objective got worse, compared with the baseline file at path"""
+    with open(path) as f:
+        baseline = {(row['num_workers'], row['num_days']): row for row in json.load(f)['rows']}
+    regressions = []
+    for row in rows:
+        before = baseline.get((row['num_workers'], row['num_days']))
+        if before is None:
+            continue
+        for key in ('build_time', 'first_solution_time', 'solve_time', 'payload_time'):
+            if row[key] is not None and before[key] is not None and row[key] > before[key] * (1 + tolerance):
+                regressions.append((row['num_workers'], row['num_days'], key, before[key], row[key]))
+        for key in ('variables', 'constraints'):
+            if row[key] > before[key]:
+                regressions.append((row['num_workers'], row['num_days'], key, before[key], row[key]))
+        # a baseline without an objective found no solution either, only losing one is a regression
+        if before['objective'] is not None and (row['objective'] is None or row['objective'] > before['objective']):
+            regressions.append((row['num_workers'], row['num_days'], 'objective', before['objective'], row['objective']))
+    return regressions
+
+
+def print_rows(rows):
+    if not rows:
+        return
+    columns = list(rows[0])
+    print('\t'.join(columns))
+    for row in rows:
+        print('\t'.join(f'{row[c]:.3f}' if isinstance(row[c], float) else str(row[c]) for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JadualModel benchmarks')
+    parser.add_argument('suite', choices=['scaling', 'sequence', 'payload'], nargs='?', default='scaling')
+    parser.add_argument('--grid', help='comma separated WORKERSxDAYS points, e.g. 25x14,300x90')
+    parser.add_argument('--time-limit', type=float, default=60.0)
+    parser.add_argument('--baseline', help='baseline json file to write, or to compare against with --compare')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--horizons', default='14,28,56', help='sequence suite: comma separated numbers of days')
+    parser.add_argument(
+        '--sequence', default='2,3,4,4,6,6',
+        help='sequence suite: hard_min,soft_min,min_cost,soft_max,hard_max,max_cost'
+    )
+    args = parser.parse_args()
+
+    if args.suite == 'sequence':
+        horizons = tuple(int(n) for n in args.horizons.split(','))
+        sequence = tuple(int(n) for n in args.sequence.split(','))
+        print_rows(benchmark_sequence_encodings(horizons, sequence=sequence, time_limit=args.time_limit))
+        return
+    if args.suite == 'payload':
+        print_rows(benchmark_payload_annotation())
+        return
+
+    grid = SCALING_GRID
+    if args.grid:
+        grid = tuple(tuple(int(n) for n in point.split('x')) for point in args.grid.split(','))
+    rows = benchmark_scaling(grid, time_limit=args.time_limit)
+    print_rows(rows)
+    if args.baseline and args.compare:
+        for regression in compare_to_baseline(rows, args.baseline):
+            print('REGRESSION', *regression)
+    elif args.baseline:
+        write_baseline(rows, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import json
+import os
+import time
+import uuid
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class RosterCache():
+    """Size bounded LRU cache of solved rosters on local disk.
+
+    Each entry is keyed by the input digest of a JadualModel and stored as two
+    files: <digest>.pb, the serialized CpModelProto, and <digest>.json, the
+    solve result with its dense assignment. Reads refresh the entry's mtime and
+    writes evict the least recently used entries until the cache fits max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def paths(self, digest):
+        base = os.path.join(self.directory, digest)
+        return base + '.pb', base + '.json'
+
+    def get(self, digest):
+        """cached entry for digest, or None"""
+        model_path, entry_path = self.paths(digest)
+        try:
+            with open(entry_path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        now = time.time()
+        for path in (model_path, entry_path):
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return entry
+
+    def model_path(self, digest):
+        """path of the serialized CpModelProto of a cached entry"""
+        return self.paths(digest)[0]
+
+    def put(self, digest, model, entry):
+        """store the cp_model and its solve result entry under digest"""
+        model_path, entry_path = self.paths(digest)
+        # unique per write, threads of one process may store the same digest at once
+        token = uuid.uuid4().hex
+        tmp_model_path = f'{model_path}.{token}.tmp.pb'
+        tmp_entry_path = f'{entry_path}.{token}.tmp'
+        model.ExportToFile(tmp_model_path)
+        with open(tmp_entry_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_model_path, model_path)
+        os.replace(tmp_entry_path, entry_path)
+        self.evict()
+
+    def entries(self):
+        """(last used, size, digest) of every cached entry"""
+        entries = {}
+        for name in os.listdir(self.directory):
+            if '.tmp' in name:
+                continue
+            digest, ext = os.path.splitext(name)
+            if ext not in ('.pb', '.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            mtime, size = entries.get(digest, (0, 0))
+            entries[digest] = (max(mtime, stat.st_mtime), size + stat.st_size)
+        return sorted((mtime, size, digest) for digest, (mtime, size) in entries.items())
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, digest in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self.paths(digest):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            log.info(f'evicted roster cache entry {digest}')
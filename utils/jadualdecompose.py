@@ -0,0 +1,197 @@
+from dataclasses import dataclass, field
+from utils.jadualortools import JadualModel, SolveResult, DEFAULT_SOLVER_PROFILE
+from utils.jadualbatch import RosterJob, solve_batch
+import numpy as np
+import logging
+
+log = logging.getLogger(__name__)
+
+# constraint families that tie every worker together, a model using them is never split
+COUPLING_CONSTRAINTS = ('fairness_allocation',)
+
+
+@dataclass
+class Component:
+    """workers and duty ids that only interact with each other"""
+    workers: list
+    duties: list
+    job_result: object = None
+
+
+@dataclass
+class DecomposedResult:
+    """merged outcome of the component solves, result spans every worker, date and slot of the tenant"""
+    status: str
+    payload: str = None
+    schedule_data: dict = field(default_factory=dict)
+    result: SolveResult = None
+    components: list = field(default_factory=list)
+
+
+def worker_components(jadual):
+    """Connected components of the worker - duty eligibility graph.
+
+    A worker is linked to every duty id it is role eligible for on some date. Leaves,
+    off days, requests, sequences, sums and transitions only involve a single worker,
+    so workers are coupled through shared duties alone (cover, excess cover and
+    maximize_workers_per_shift). Components are returned largest first. Duties no worker is
+    eligible for join the largest component, whose cover constraint then fails or holds
+    for them exactly as in the whole tenant's model.
+    """
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    for w in jadual.workers_list:
+        find(('worker', w))
+    for d in jadual.date_list:
+        for s in jadual.duty_id_for_dates[d]:
+            find(('duty', s))
+            for w in jadual.workers_list:
+                if jadual.role_eligible(w, d, s):
+                    union(('worker', w), ('duty', s))
+
+    groups = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    components = []
+    for nodes in groups.values():
+        workers = [w for kind, w in nodes if kind == 'worker']
+        duties = [s for kind, s in nodes if kind == 'duty']
+        components.append(Component(workers, duties))
+    components.sort(key=lambda c: (len(c.workers), len(c.duties)), reverse=True)
+    unstaffed = [c for c in components if not c.workers]
+    if unstaffed and len(unstaffed) < len(components):
+        components = [c for c in components if c.workers]
+        for component in unstaffed:
+            log.info(f'no worker is eligible for duties {component.duties}, they are covered with the largest group')
+            components[0].duties.extend(component.duties)
+    return components
+
+
+def component_model_kwargs(model_kwargs, component, prior_timeslots):
+    """JadualModel arguments restricted to the workers of one component. The duties of the other
+    components stay in the model as external_duties: their cells are folded to 0 as in the whole
+    tenant's model, so sequence and transition series are the same and the objectives add up"""
+    workers = set(component.workers)
+    duties = set(component.duties)
+    kwargs = dict(model_kwargs)
+    kwargs['workers_list'] = list(component.workers)
+    kwargs['workers_roles'] = {w: roles for w, roles in model_kwargs['workers_roles'].items() if w in workers}
+    kwargs['requests_data'] = [r for r in model_kwargs['requests_data'] if r['workerId'] in workers]
+    all_duties = {s for slots in model_kwargs['duty_id_for_dates'].values() for s in slots}
+    kwargs['external_duties'] = sorted(all_duties - duties, key=str)
+    kwargs['prior_timeslots'] = prior_timeslots
+    return kwargs
+
+
+def merge_results(jadual, components):
+    """one SolveResult over the whole tenant from the component results. every objective term belongs
+    to a single worker or a single duty, so objectives and bounds add up; wall time is the slowest
+    component and status the worst one"""
+    results = [c.job_result.result for c in components]
+    if all(r.status == "OPTIMAL" for r in results):
+        worst = results[0]
+    elif all(r.has_solution for r in results):
+        worst = next(r for r in results if r.status != "OPTIMAL")
+    else:
+        worst = next(r for r in results if not r.has_solution)
+    status = worst.status
+
+    dates, slots = [], []
+    for r in results:
+        dates.extend(d for d in r.dates if d not in dates)
+        slots.extend(s for s in r.slots if s not in slots)
+    dates = [d for d in jadual.date_prior_list if d in dates] + [d for d in dates if d not in jadual.date_prior_list]
+    merged = SolveResult(
+        status=status,
+        status_code=worst.status_code,
+        wall_time=max(r.wall_time for r in results),
+        conflicts=sum(r.conflicts for r in results),
+        branches=sum(r.branches for r in results),
+        solver_profile=results[0].solver_profile,
+        solver_parameters=results[0].solver_parameters,
+        num_solutions=sum(r.num_solutions for r in results),
+        workers=list(jadual.workers_list),
+        dates=dates,
+        slots=slots,
+    )
+    if status in ("OPTIMAL", "FEASIBLE"):
+        merged.objective = sum(r.objective for r in results)
+        merged.best_bound = sum(r.best_bound for r in results)
+        merged.assignment = np.full((len(merged.workers), len(dates), len(slots)), -1, dtype=np.int8)
+        for r in results:
+            worker_idx = np.array([merged.worker_index[w] for w in r.workers], dtype=np.int64)
+            date_idx = np.array([merged.date_index[d] for d in r.dates], dtype=np.int64)
+            slot_idx = np.array([merged.slot_index[s] for s in r.slots], dtype=np.int64)
+            block = merged.assignment[np.ix_(worker_idx, date_idx, slot_idx)]
+            # a cell is only ever a literal in one component, keep the solved value over -1
+            merged.assignment[np.ix_(worker_idx, date_idx, slot_idx)] = np.maximum(block, r.assignment)
+    return merged
+
+
+def solve_by_components(
+    model_kwargs,
+    constraints,
+    duties_by_shift,
+    min_off_day = 0,
+    max_off_day = 1,
+    solver_profile = DEFAULT_SOLVER_PROFILE,
+    solver_parameters = None,
+    max_concurrent = None,
+    total_cores = None,
+    executor = 'process'
+):
+    """Split the tenant into independent worker groups, solve each as its own default_model in
+    parallel through solve_batch and merge the assignments into one schedule_data and payload.
+    Tenants with a single component, or using a constraint in COUPLING_CONSTRAINTS, are solved whole."""
+    jadual = JadualModel(**model_kwargs)
+    components = worker_components(jadual)
+    if any(c["functionName"] in COUPLING_CONSTRAINTS for c in constraints):
+        all_duties = [s for d in jadual.date_list for s in jadual.duty_id_for_dates[d]]
+        components = [Component(list(jadual.workers_list), list(dict.fromkeys(all_duties)))]
+    log.info(f'solving {len(components)} worker groups: {[len(c.workers) for c in components]} workers')
+
+    # query the prior roster once instead of once per component
+    prior_timeslots = jadual.load_prior_timeslots() if jadual.uses_prior_roster() else model_kwargs.get('prior_timeslots')
+    if jadual.uses_prior_roster():
+        jadual.date_prior_list = jadual.prior_date_range()
+
+    method_kwargs = dict(
+        constraints=constraints,
+        duties_by_shift=duties_by_shift,
+        min_off_day=min_off_day,
+        max_off_day=max_off_day,
+        solver_profile=solver_profile,
+        solver_parameters=solver_parameters,
+    )
+    jobs = [
+        RosterJob(str(index), component_model_kwargs(model_kwargs, component, prior_timeslots), 'default_model', method_kwargs)
+        for index, component in enumerate(components)
+    ]
+    for job_result in solve_batch(jobs, max_concurrent, total_cores, executor):
+        if job_result.error:
+            raise RuntimeError(f'worker group {job_result.job_id} failed:\n{job_result.error}')
+        components[int(job_result.job_id)].job_result = job_result
+
+    jadual.result = merge_results(jadual, components)
+    for component in components:
+        for w, d, s in component.job_result.request_list:
+            jadual.request_list.append((w, d, s))
+            # populate_requests orders the payload days, requested days first
+            jadual.schedule_data.setdefault(d, {})
+    jadual.populate_solved_data()
+    outcome = DecomposedResult(jadual.result.status, schedule_data=jadual.schedule_data, result=jadual.result, components=components)
+    if jadual.result.has_solution:
+        outcome.payload = jadual.lambda_payload()
+    return outcome
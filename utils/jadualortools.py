@@ -1,16 +1,73 @@
 from ortools.sat.python import cp_model
+import ortools
 from utils.timeslots import parse_ISO8601_date_to_datetime
 from utils.appsync import query, timeslotsByTenantId
+from utils.jadualprofile import BuildProfiler
 from itertools import product
+from dataclasses import dataclass, field, replace
+from collections import OrderedDict
 import pandas as pd
+import numpy as np
 import datetime
 import utils.utils as utils
+import hashlib
+import base64
+import json
 import random
+import threading
 import logging
 
 log = logging.getLogger(__name__)
 
 
+class LinearTerms():
+    """Linear expression collected as parallel variable / coefficient arrays.
+
+    Adding a variable that is already present merges the coefficients, e.g. two
+    -50 request rewards on the same literal become one -100 term, and ints are
+    folded into the constant. expression() is a single LinearExpr.WeightedSum and
+    add_bounded emits lb <= expression <= ub as one linear constraint, instead of
+    a Python sum() generator per side.
+    """
+
+    def __init__(self, variables=(), coeffs=None, constant=0):
+        self.positions = {}
+        self.variables = []
+        self.coeffs = []
+        self.constant = constant
+        self.extend(variables, coeffs)
+
+    def add(self, variable, coeff=1):
+        if isinstance(variable, (int, np.integer)):
+            self.constant += int(variable) * coeff
+            return
+        key = variable.Index()
+        if key in self.positions:
+            self.coeffs[self.positions[key]] += coeff
+        else:
+            self.positions[key] = len(self.variables)
+            self.variables.append(variable)
+            self.coeffs.append(coeff)
+
+    def extend(self, variables, coeffs=None):
+        if coeffs is None:
+            for variable in variables:
+                self.add(variable)
+        else:
+            for variable, coeff in zip(variables, coeffs):
+                self.add(variable, coeff)
+
+    def expression(self):
+        """the terms as one weighted sum, merged terms that cancel out are left out"""
+        terms = [(v, c) for v, c in zip(self.variables, self.coeffs) if c != 0]
+        expression = cp_model.LinearExpr.WeightedSum([v for v, _ in terms], [c for _, c in terms])
+        return expression + self.constant if self.constant else expression
+
+    def add_bounded(self, model, lb, ub):
+        """lb <= terms <= ub as a single constraint"""
+        return model.AddLinearConstraint(self.expression(), lb, ub)
+
+
 def negated_bounded_span(works, start, length):
     """Filters an isolated sub-sequence of variables assined to True.
     Extract the span of Boolean variables [start, start + length), negate them,
@@ -38,7 +95,7 @@ def negated_bounded_span(works, start, length):
 
 
 def add_soft_sequence_constraint(model, works, hard_min, soft_min, min_cost,
-                                    soft_max, hard_max, max_cost, prefix):
+                                    soft_max, hard_max, max_cost, prefix, enforcement=None):
     """Sequence constraint on true variables with soft and hard bounds.
     This constraint look at every maximal contiguous sequence of variables
     assigned to true. If forbids sequence of length < hard_min or > hard_max.
@@ -59,17 +116,19 @@ def add_soft_sequence_constraint(model, works, hard_min, soft_min, min_cost,
     max_cost: the coefficient of the linear penalty if the length is more than
         soft_max.
     prefix: a base name for penalty literals.
+    enforcement: if given, a literal the hard bounds are only enforced by.
     Returns:
     a tuple (variables_list, coefficient_list) containing the different
     penalties created by the sequence constraint.
     """
     cost_literals = []
     cost_coefficients = []
+    hard_constraints = []
 
     # Forbid sequences that are too short.
     for length in range(1, hard_min):
         for start in range(len(works) - length + 1):
-            model.AddBoolOr(negated_bounded_span(works, start, length))
+            hard_constraints.append(model.AddBoolOr(negated_bounded_span(works, start, length)))
 
     # Penalize sequences that are below the soft limit.
     if min_cost > 0:
@@ -100,13 +159,99 @@ def add_soft_sequence_constraint(model, works, hard_min, soft_min, min_cost,
 
     # Just forbid any sequence of true variables with length hard_max + 1
     for start in range(len(works) - hard_max):
-        model.AddBoolOr(
-            [works[i].Not() for i in range(start, start + hard_max + 1)])
+        hard_constraints.append(model.AddBoolOr(
+            [works[i].Not() for i in range(start, start + hard_max + 1)]))
+
+    if enforcement is not None:
+        for constraint in hard_constraints:
+            constraint.OnlyEnforceIf(enforcement)
     return cost_literals, cost_coefficients
 
 
+def add_run_length_sequence_constraint(model, works, hard_min, soft_min, min_cost,
+                                       soft_max, hard_max, max_cost, prefix):
+    """Counter based encoding of add_soft_sequence_constraint.
+    Instead of one clause per (start, length) span, this keeps a run-length
+    integer variable per position that counts the current streak of true
+    variables, and checks the length bounds only where a streak ends. The
+    model grows with len(works) rather than len(works) * hard_max.
+    Both encodings give the same penalties when hard_min >= 1. With hard_min
+    = 0 add_soft_sequence_constraint also penalizes the empty spans (a false
+    first or last variable and every two false neighbours) by min_cost *
+    soft_min each, this encoding only penalizes streaks of true variables.
+    Args:
+    model: the sequence constraint is built on this model.
+    works: a list of Boolean variables.
+    hard_min: any sequence of true variables must have a length of at least
+        hard_min.
+    soft_min: any sequence should have a length of at least soft_min, or a
+        linear penalty on the delta will be added to the objective.
+    min_cost: the coefficient of the linear penalty if the length is less than
+        soft_min.
+    soft_max: any sequence should have a length of at most soft_max, or a linear
+        penalty on the delta will be added to the objective.
+    hard_max: any sequence of true variables must have a length of at most
+        hard_max.
+    max_cost: the coefficient of the linear penalty if the length is more than
+        soft_max.
+    prefix: a base name for penalty variables.
+    Returns:
+    a tuple (variables_list, coefficient_list) containing the different
+    penalties created by the sequence constraint.
+    """
+    cost_variables = []
+    cost_coefficients = []
+    previous_run = None
+
+    for t, work in enumerate(works):
+        # run[t] is the length of the streak of true variables ending at t.
+        run = model.NewIntVar(0, hard_max, f'{prefix}: run({t})')
+        model.Add(run == 0).OnlyEnforceIf(work.Not())
+        if previous_run is None:
+            model.Add(run == 1).OnlyEnforceIf(work)
+        else:
+            model.Add(run == previous_run + 1).OnlyEnforceIf(work)
+        previous_run = run
+
+        # A streak ends at t if works[t] is true and works[t + 1] is not.
+        if t + 1 < len(works):
+            end = model.NewBoolVar(f'{prefix}: end({t})')
+            model.AddBoolOr([work.Not(), works[t + 1], end])
+            model.AddImplication(end, work)
+            model.AddImplication(end, works[t + 1].Not())
+        else:
+            end = work
+
+        if hard_min > 1:
+            model.Add(run >= hard_min).OnlyEnforceIf(end)
+
+        # Penalize streaks that end below the soft limit.
+        if min_cost > 0 and soft_min > max(hard_min, 1):
+            under = model.NewIntVar(0, soft_min - 1, f'{prefix}: under_run({t})')
+            model.Add(under >= soft_min - run).OnlyEnforceIf(end)
+            cost_variables.append(under)
+            cost_coefficients.append(min_cost)
+
+        # Penalize streaks that end above the soft limit.
+        if max_cost > 0 and soft_max < hard_max:
+            over = model.NewIntVar(0, hard_max - soft_max, f'{prefix}: over_run({t})')
+            model.Add(over >= run - soft_max).OnlyEnforceIf(end)
+            cost_variables.append(over)
+            cost_coefficients.append(max_cost)
+
+    return cost_variables, cost_coefficients
+
+
+# sequence constraint encodings selectable through the "encoding" key of a sequence constraint,
+# interchangeable unless hardMin is 0 (see add_run_length_sequence_constraint)
+SEQUENCE_ENCODINGS = {
+    'SPAN': add_soft_sequence_constraint,
+    'RUN_LENGTH': add_run_length_sequence_constraint,
+}
+
+
 def add_soft_sum_constraint(model, works, hard_min, soft_min, min_cost,
-                            soft_max, hard_max, max_cost, prefix):
+                            soft_max, hard_max, max_cost, prefix, offset=0):
     """Sum constraint with soft and hard bounds.
     This constraint counts the variables assigned to true from works.
     If forbids sum < hard_min or > hard_max.
@@ -127,6 +272,8 @@ def add_soft_sum_constraint(model, works, hard_min, soft_min, min_cost,
     max_cost: the coefficient of the linear penalty if the sum is more than
         soft_max.
     prefix: a base name for penalty variables.
+    offset: a constant added to the sum, e.g. the assignments already made
+        in earlier windows of a rolling horizon.
     Returns:
     a tuple (variables_list, coefficient_list) containing the different
     penalties created by the sequence constraint.
@@ -135,29 +282,697 @@ def add_soft_sum_constraint(model, works, hard_min, soft_min, min_cost,
     cost_coefficients = []
     sum_var = model.NewIntVar(hard_min, hard_max, '')
     # This adds the hard constraints on the sum.
-    model.Add(sum_var == sum(works))
+    terms = LinearTerms(works, constant=offset)
+    terms.add(sum_var, -1)
+    terms.add_bounded(model, 0, 0)
 
     # Penalize sums below the soft_min target.
+    # the deltas are bounded by the hard limits, not by a week: monthly sums go well past 7
     if soft_min > hard_min and min_cost > 0:
-        delta = model.NewIntVar(-len(works), len(works), '')
+        delta = model.NewIntVar(soft_min - hard_max, soft_min - hard_min, '')
         model.Add(delta == soft_min - sum_var)
         # TODO(user): Compare efficiency with only excess >= soft_min - sum_var.
-        excess = model.NewIntVar(0, 7, prefix + ': under_sum')
+        excess = model.NewIntVar(0, soft_min - hard_min, prefix + ': under_sum')
         model.AddMaxEquality(excess, [delta, 0])
         cost_variables.append(excess)
         cost_coefficients.append(min_cost)
 
     # Penalize sums above the soft_max target.
     if soft_max < hard_max and max_cost > 0:
-        delta = model.NewIntVar(-7, 7, '')
+        delta = model.NewIntVar(hard_min - soft_max, hard_max - soft_max, '')
         model.Add(delta == sum_var - soft_max)
-        excess = model.NewIntVar(0, 7, prefix + ': over_sum')
+        excess = model.NewIntVar(0, hard_max - soft_max, prefix + ': over_sum')
         model.AddMaxEquality(excess, [delta, 0])
         cost_variables.append(excess)
         cost_coefficients.append(max_cost)
 
     return cost_variables, cost_coefficients
 
+
+@dataclass
+class SolveResult:
+    """Outcome of a single CP-SAT search over a JadualModel.
+    Everything downstream of the solve (feasibility check, schedule data,
+    payload, debug printing) reads from this object so one run costs one search.
+    assignment is a worker x date x slot int8 array holding the solved value of
+    every work literal, or -1 where the model has no literal for that cell.
+    stages holds one summary per objective stage of a lexicographic solve.
+    """
+    status: str
+    status_code: int
+    objective: float = None
+    best_bound: float = None
+    wall_time: float = 0.0
+    conflicts: int = 0
+    branches: int = 0
+    solver_profile: str = None
+    solver_parameters: dict = field(default_factory=dict)
+    first_solution_time: float = None
+    num_solutions: int = 0
+    hint_source: str = None
+    build_profile: dict = None
+    workers: list = field(default_factory=list)
+    dates: list = field(default_factory=list)
+    slots: list = field(default_factory=list)
+    assignment: np.ndarray = None
+    stages: list = field(default_factory=list)
+
+    def __post_init__(self):
+        self.worker_index = {w: i for i, w in enumerate(self.workers)}
+        self.date_index = {d: i for i, d in enumerate(self.dates)}
+        self.slot_index = {s: i for i, s in enumerate(self.slots)}
+
+    def to_record(self):
+        """JSON serialisable form of the result, dates as ISO strings and the assignment as base64 int8 bytes"""
+        record = {
+            name: getattr(self, name) for name in (
+                'status', 'status_code', 'objective', 'best_bound', 'wall_time', 'conflicts', 'branches',
+                'solver_profile', 'solver_parameters', 'first_solution_time', 'num_solutions', 'hint_source',
+                'build_profile', 'workers', 'slots', 'stages'
+            )
+        }
+        record['status_code'] = int(self.status_code)
+        record['dates'] = [d.isoformat() for d in self.dates]
+        if self.assignment is not None:
+            record['assignment_shape'] = list(self.assignment.shape)
+            record['assignment'] = base64.b64encode(np.ascontiguousarray(self.assignment).tobytes()).decode('ascii')
+        return record
+
+    @classmethod
+    def from_record(cls, record, dates=None):
+        """inverse of to_record. dates, if given, replaces the stored ISO dates with the caller's own date objects"""
+        record = dict(record)
+        stored_dates = record.pop('dates')
+        encoded = record.pop('assignment', None)
+        shape = record.pop('assignment_shape', None)
+        result = cls(dates=dates if dates is not None else [to_date(d) for d in stored_dates], **record)
+        if encoded is not None:
+            assignment = np.frombuffer(base64.b64decode(encoded), dtype=np.int8).reshape(shape)
+            result.assignment = assignment.copy()
+        return result
+
+    @property
+    def has_solution(self):
+        return self.status in ("OPTIMAL", "FEASIBLE")
+
+    def value(self, w, d, s):
+        """solved value of work literal (w, d, s), None if there is no solution or no such literal"""
+        if self.assignment is None:
+            return None
+        try:
+            value = self.assignment[self.worker_index[w], self.date_index[d], self.slot_index[s]]
+        except KeyError:
+            return None
+        return None if value < 0 else int(value)
+
+    def assigned_workers(self, d, s):
+        """workers assigned to slot s on date d"""
+        if self.assignment is None or d not in self.date_index or s not in self.slot_index:
+            return []
+        column = self.assignment[:, self.date_index[d], self.slot_index[s]]
+        return [self.workers[i] for i in np.flatnonzero(column == 1)]
+
+    def slot_totals(self):
+        """number of assignments per slot over the whole horizon"""
+        if self.assignment is None:
+            return {}
+        totals = (self.assignment == 1).sum(axis=(0, 1))
+        return {s: int(total) for s, total in zip(self.slots, totals)}
+
+
+def canonical(value):
+    """JSON serialisable form of a model input with a stable ordering: dict items and sets are sorted,
+    dates become ISO strings and DataFrames their split JSON, so equal inputs always give equal digests"""
+    if isinstance(value, pd.DataFrame):
+        return {'__frame__': value.to_json(orient='split', date_format='iso', default_handler=str)}
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        items = [[canonical(k), canonical(v)] for k, v in value.items()]
+        return {'__dict__': sorted(items, key=lambda item: json.dumps(item[0], sort_keys=True))}
+    if isinstance(value, (set, frozenset)):
+        return {'__set__': sorted((canonical(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))}
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+# solver statuses worth caching, an UNKNOWN or MODEL_INVALID outcome is retried on the next request
+CACHEABLE_STATUSES = (cp_model.OPTIMAL, cp_model.FEASIBLE, cp_model.INFEASIBLE)
+
+# part of every roster cache digest, bump it whenever a change to the model build can change a solved roster
+CACHE_VERSION = 1
+
+
+def status_from_code(solution_status):
+    """maps a cp_model solver status to the status strings used by the roster service"""
+    if solution_status == cp_model.OPTIMAL:
+        return "OPTIMAL"
+    elif solution_status == cp_model.FEASIBLE:
+        return "FEASIBLE"
+    return "INFEASIBLE"
+
+
+TRANSITION_STRATEGIES = ('never', 'min', 'max', 'always')
+
+# hard rule groups an explain_infeasibility build guards with assumption literals, and how a reason reads
+INFEASIBILITY_RULES = {
+    'cover': 'min / max staff of a duty',
+    'off_days': 'off days per week',
+    'one_shift_per_day': 'one duty or leave per worker per day',
+    'sequence': 'hard min / max of a consecutive sequence',
+    'sum': 'hard min / max of a weekly or monthly sum',
+    'transition': 'transition rule',
+    'fairness': 'fair allocation of a duty',
+    'request': 'request',
+    'selected_roster': 'selected roster slot',
+}
+
+# parameter overrides of an explain_infeasibility solve, the conflicting sets come from a single worker search
+EXPLAIN_SOLVER_PARAMETERS = {
+    "num_search_workers": 1,
+}
+
+
+@dataclass(frozen=True)
+class InfeasibilityReason:
+    """one assumption of an explain_infeasibility build: a rule of INFEASIBILITY_RULES and the worker,
+    date and slot it applies to, None where the group spans them"""
+    rule: str
+    worker: str = None
+    date: object = None
+    slot: str = None
+    detail: str = None
+
+    def describe(self):
+        parts = [INFEASIBILITY_RULES.get(self.rule, self.rule)]
+        if self.detail:
+            parts.append(f'({self.detail})')
+        if self.worker is not None:
+            parts.append(f'for worker {self.worker}')
+        if self.slot is not None:
+            parts.append(f'on slot {self.slot}')
+        if self.date is not None:
+            parts.append(f'on {to_date(self.date).isoformat()}')
+        return ' '.join(parts)
+
+
+@dataclass
+class InfeasibilityExplanation:
+    """Outcome of explain_infeasibility.
+    status is the status of the guarded model with every assumption on. when it is
+    INFEASIBLE, reasons is a conflicting subset of the assumptions: the rules can not
+    all hold together. reasons is empty for a feasible model, and for an infeasible
+    one whose conflict lies within the unguarded part (role eligibility, prior roster).
+    """
+    status: str
+    reasons: list = field(default_factory=list)
+    num_assumptions: int = 0
+    solves: int = 0
+    wall_time: float = 0.0
+
+    def describe(self):
+        """one line per reason, reasons that only differ by date share a line"""
+        dates = {}
+        for reason in self.reasons:
+            dates.setdefault(replace(reason, date=None), []).append(reason.date)
+        lines = []
+        for reason, days in dates.items():
+            days = sorted(to_date(d) for d in days if d is not None)
+            if len(days) == 1:
+                lines.append(replace(reason, date=days[0]).describe())
+            elif days:
+                lines.append(f'{reason.describe()} on {len(days)} days from {days[0].isoformat()} to {days[-1].isoformat()}')
+            else:
+                lines.append(reason.describe())
+        return lines
+
+# objective families a lexicographic solve can stage, 'default' is the full weighted objective of minimize().
+# coverage, fairness and off_days only have terms when maximize_workers_per_shift, fairness_allocation and
+# minimize_off_days / maximize_off_days are in the constraints
+OBJECTIVE_FAMILIES = (
+    'default', 'coverage', 'excess_covers', 'requests', 'transitions', 'sequences', 'sums', 'fairness', 'off_days'
+)
+
+# CP-SAT parameter sets selectable by name through JadualModel.apply_solver_profile
+SOLVER_PROFILES = {
+    # roster requests from the UI, must come back well within the lambda timeout
+    "interactive": {
+        "max_time_in_seconds": 30.0,
+        "num_search_workers": 8,
+        "relative_gap_limit": 0.01,
+        "absolute_gap_limit": 0.0,
+        "linearization_level": 1,
+        "random_seed": 0,
+    },
+    # month end rosters generated offline, spend the time to close the gap
+    "overnight_batch": {
+        "max_time_in_seconds": 1800.0,
+        "num_search_workers": 16,
+        "relative_gap_limit": 0.0,
+        "absolute_gap_limit": 0.0,
+        "linearization_level": 2,
+        "random_seed": 0,
+    },
+    # same inputs give the same roster: single worker and a deterministic time limit
+    "deterministic": {
+        "max_deterministic_time": 60.0,
+        "num_search_workers": 1,
+        "relative_gap_limit": 0.0,
+        "absolute_gap_limit": 0.0,
+        "linearization_level": 1,
+        "random_seed": 42,
+    },
+}
+# no profile: the CP-SAT defaults, as before profiles existed. callers opt into a profile by name
+DEFAULT_SOLVER_PROFILE = None
+# limits solve_lexicographic shares out between its stages, whichever of them the profile sets
+STAGE_BUDGET_PARAMETERS = ('max_time_in_seconds', 'max_deterministic_time')
+
+
+def to_date(value):
+    """normalise a date, datetime or ISO8601 string to a datetime.date so roster lookups cannot silently miss"""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return parse_ISO8601_date_to_datetime(value).date()
+
+
+class SolutionTimer(cp_model.CpSolverSolutionCallback):
+    """records the wall time of the first solution and the number of improving solutions"""
+
+    def __init__(self):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.first_solution_time = None
+        self.num_solutions = 0
+        self.stop_requested = False
+
+    def on_solution_callback(self):
+        if self.first_solution_time is None:
+            self.first_solution_time = self.WallTime()
+        self.num_solutions += 1
+        if self.stop_requested:
+            self.StopSearch()
+
+    def stop(self):
+        """stop the search. a stop that comes before the solver has registered the callback is kept and
+        applied at the first solution"""
+        self.stop_requested = True
+        self.StopSearch()
+
+
+@dataclass
+class PooledRoster:
+    """one roster of a SolutionPool, the work literal values in work_layout order packed to bits"""
+    objective: float
+    packed: bytes
+    wall_time: float
+
+    def values(self, size):
+        return np.unpackbits(np.frombuffer(self.packed, dtype=np.uint8), count=size).astype(np.int8)
+
+
+class SolutionPool(SolutionTimer):
+    """Keeps the size best distinct rosters reported during one search.
+
+    var_indices are the model indices of the work literals, in work_layout order.
+    A new roster is dropped if it repeats, or lies less than min_distance changed
+    literals (Hamming distance) from, a kept roster at least as good, and it
+    replaces the worse kept rosters it is that close to. CP-SAT reports improving
+    solutions, so the pool holds the last rosters of the search, and
+    JadualModel.fill_solution_pool tops up a pool the search left short.
+    """
+
+    def __init__(self, var_indices, size, min_distance=0):
+        SolutionTimer.__init__(self)
+        self.var_indices = [int(i) for i in var_indices]
+        self.size = size
+        self.min_distance = min_distance
+        self.rosters = []
+
+    @staticmethod
+    def distance(a, b):
+        return int(np.unpackbits(np.bitwise_xor(np.frombuffer(a, dtype=np.uint8), np.frombuffer(b, dtype=np.uint8))).sum())
+
+    def solution_values(self):
+        """value of every work literal in the solution being reported"""
+        return np.fromiter((self.SolutionIntegerValue(i) for i in self.var_indices), dtype=np.uint8, count=len(self.var_indices))
+
+    def on_solution_callback(self):
+        SolutionTimer.on_solution_callback(self)
+        self.offer(self.solution_values())
+
+    def offer(self, values):
+        self.keep(PooledRoster(self.ObjectiveValue(), np.packbits(values).tobytes(), self.WallTime()))
+
+    def keep(self, roster):
+        if not self.size:
+            return
+        # a min_distance of 0 still drops exact repeats
+        close = [kept for kept in self.rosters if self.distance(kept.packed, roster.packed) < max(self.min_distance, 1)]
+        if any(kept.objective <= roster.objective for kept in close):
+            return
+        self.rosters = [kept for kept in self.rosters if kept not in close] + [roster]
+        self.rosters.sort(key=lambda kept: kept.objective)
+        del self.rosters[self.size:]
+
+
+@dataclass
+class SolutionEvent:
+    """one improving solution published by a SolutionStream. assigned and unassigned are the (worker, date, slot)
+    work literals that changed to 1 and to 0 since the previous event, the first event lists every assignment"""
+    index: int
+    objective: float
+    best_bound: float
+    wall_time: float
+    assigned: list = field(default_factory=list)
+    unassigned: list = field(default_factory=list)
+
+
+class SolutionStream(SolutionPool):
+    """Publishes every improving solution of a search as a SolutionEvent while the solver runs.
+
+    listener(event) is called from the solver thread, a truthy return value stops
+    the search after that solution, as does stop() from another thread. on_stop, if
+    given, is called for a listener's stop instead of stop(), JadualModel passes its
+    stop_search so the stop also ends the stages that would follow. cells gives the
+    (worker, date, slot) ids of the work literals, in work_layout order. The rosters
+    are also offered to the solution pool when pool_size is set.
+    """
+
+    def __init__(self, var_indices, cells, listener, pool_size=0, min_distance=0, on_stop=None):
+        SolutionPool.__init__(self, var_indices, pool_size, min_distance)
+        self.cells = cells
+        self.listener = listener
+        self.on_stop = on_stop or self.stop
+        self.previous = np.zeros(len(self.var_indices), dtype=np.uint8)
+
+    def keys(self, positions):
+        workers, dates, slots, cells = self.cells
+        return [(workers[cells[i, 0]], dates[cells[i, 1]], slots[cells[i, 2]]) for i in positions]
+
+    def on_solution_callback(self):
+        SolutionTimer.on_solution_callback(self)
+        values = self.solution_values()
+        self.offer(values)
+        changed = values != self.previous
+        event = SolutionEvent(
+            index=self.num_solutions,
+            objective=self.ObjectiveValue(),
+            best_bound=self.BestObjectiveBound(),
+            wall_time=self.WallTime(),
+            assigned=self.keys(np.flatnonzero(changed & (values == 1))),
+            unassigned=self.keys(np.flatnonzero(changed & (values == 0))),
+        )
+        self.previous = values
+        if self.listener(event):
+            self.on_stop()
+
+
+# last SolveResult per (tenant_id, first date, last date), used to warm start the next solve of that horizon.
+# least recently used first, a long running service keeps at most MAX_LAST_SOLUTIONS of them
+LAST_SOLUTIONS = OrderedDict()
+LAST_SOLUTIONS_LOCK = threading.Lock()
+MAX_LAST_SOLUTIONS = 256
+
+
+def remember_last_solution(key, result):
+    """keep the assignment of result as the last solution of key, only what a warm start needs"""
+    kept = replace(result, build_profile=None, stages=[], solver_parameters={})
+    with LAST_SOLUTIONS_LOCK:
+        LAST_SOLUTIONS[key] = kept
+        LAST_SOLUTIONS.move_to_end(key)
+        while len(LAST_SOLUTIONS) > MAX_LAST_SOLUTIONS:
+            LAST_SOLUTIONS.popitem(last=False)
+
+
+def last_solution(key):
+    """last solution remembered for key, or None"""
+    with LAST_SOLUTIONS_LOCK:
+        result = LAST_SOLUTIONS.get(key)
+        if result is not None:
+            LAST_SOLUTIONS.move_to_end(key)
+        return result
+
+
+def roster_slot_keys(roster):
+    """set of assigned (worker, date, slot) in a roster given as lambda_payload records"""
+    keys = set()
+    for slot in roster:
+        worker = slot.get("worker_id")
+        if not worker:
+            continue
+        slot_id = slot.get("leave_id") if slot["type"] == "Leave" else slot.get("duty_id")
+        keys.add((worker, to_date(slot["start"]), slot_id))
+    return keys
+
+
+class DutyIndex():
+    """duty metadata read once from the tenant DataFrame.
+    role, min/max staff and slot type are keyed by (date, slot) and shift membership
+    by shift id, so constraint families never filter self.df inside their loops."""
+
+    def __init__(self, df, date_list, duty_id_for_dates, leaves_id_for_dates):
+        self.df = df
+        self.roles = {}
+        self.staff = {}
+        self.slot_types = {}
+        self.shift_duties = {}
+        self.not_shift_duties = {}
+        for d in date_list:
+            for s in duty_id_for_dates[d]:
+                self.slot_types[(d, s)] = "Duty"
+                try:
+                    self.roles[(d, s)] = utils.query_df(df, d, s, 'role_id')
+                except Exception:
+                    log.info(f"slot {s} on {d} has no duty role")
+                try:
+                    min_, max_ = utils.get_min_max_staffs(df, d, s)
+                    self.staff[(d, s)] = (int(min_), int(max_))
+                except Exception:
+                    log.info(f"slot {s} on {d} has no staff limits")
+            for l in leaves_id_for_dates[d]:
+                self.slot_types[(d, l)] = "Leave"
+
+    @classmethod
+    def from_metadata(cls, roles, staff, slot_types, shift_duties):
+        """builds an index straight from (date, slot) keyed metadata, without a tenant DataFrame"""
+        index = cls.__new__(cls)
+        index.df = None
+        index.roles = dict(roles)
+        index.staff = dict(staff)
+        index.slot_types = dict(slot_types)
+        index.shift_duties = {shift_id: list(duties) for shift_id, duties in shift_duties.items()}
+        all_duties = []
+        for (d, s), slot_type in index.slot_types.items():
+            if slot_type == "Duty" and s not in all_duties:
+                all_duties.append(s)
+        index.not_shift_duties = {
+            shift_id: [s for s in all_duties if s not in duties] for shift_id, duties in index.shift_duties.items()
+        }
+        return index
+
+    def role(self, d, s):
+        """role id required by duty s on date d, None if the duty has no role"""
+        return self.roles.get((d, s))
+
+    def min_max_staff(self, d, s):
+        """(min_staff, max_staff) for duty s on date d"""
+        return self.staff[(d, s)]
+
+    def slot_type(self, d, s):
+        return self.slot_types.get((d, s))
+
+    def duties_for_shift(self, shift_id):
+        if shift_id not in self.shift_duties:
+            self.shift_duties[shift_id] = utils.filter_duties_by_shift(self.df, shift_id)
+        return self.shift_duties[shift_id]
+
+    def duties_not_in_shift(self, shift_id):
+        if shift_id not in self.not_shift_duties:
+            self.not_shift_duties[shift_id] = utils.filter_duties_by_not_shift(self.df, shift_id)
+        return self.not_shift_duties[shift_id]
+
+
+class WorkGrid():
+    """Work literals held in a dense worker x date x slot array.
+
+    Workers, dates and slots get integer indices in the order they are added, with
+    workers / dates / slots mapping an index back to its id and worker_index /
+    date_index / slot_index going the other way. literals is an object array with
+    the BoolVar of every cell and mask marks the cells that hold one, so constraint
+    families iterate indices and skip missing combinations through the mask. Axes
+    grow on demand. The grid still reads like the former {(w, d, s): literal} dict
+    for code keyed by ids.
+
+    Cells whose value is known while building, e.g. a duty the worker has no role
+    for, are folded instead of getting a BoolVar: fixed holds their 0 / 1 value and
+    -1 everywhere else. Sums count folded cells as constants and encoders that need
+    every position of a sequence see a constant literal in their place.
+    """
+
+    def __init__(self, workers=(), dates=(), slots=()):
+        self.workers, self.dates, self.slots = [], [], []
+        self.worker_index, self.date_index, self.slot_index = {}, {}, {}
+        self.literals = np.empty((0, 0, 0), dtype=object)
+        self.mask = np.zeros((0, 0, 0), dtype=bool)
+        self.fixed = np.full((0, 0, 0), -1, dtype=np.int8)
+        self.size = 0
+        self.extend(workers, dates, slots)
+
+    @staticmethod
+    def _append(ids, index, new_ids):
+        added = 0
+        for i in new_ids:
+            if i not in index:
+                index[i] = len(ids)
+                ids.append(i)
+                added += 1
+        return added
+
+    def extend(self, workers=(), dates=(), slots=()):
+        """add unseen worker, date and slot ids to the axes"""
+        grown = (
+            self._append(self.workers, self.worker_index, workers),
+            self._append(self.dates, self.date_index, dates),
+            self._append(self.slots, self.slot_index, slots),
+        )
+        if any(grown):
+            shape = (len(self.workers), len(self.dates), len(self.slots))
+            literals = np.empty(shape, dtype=object)
+            mask = np.zeros(shape, dtype=bool)
+            fixed = np.full(shape, -1, dtype=np.int8)
+            old = tuple(slice(0, n) for n in self.mask.shape)
+            literals[old] = self.literals
+            mask[old] = self.mask
+            fixed[old] = self.fixed
+            self.literals, self.mask, self.fixed = literals, mask, fixed
+
+    def worker_indices(self, workers):
+        return [self.worker_index[w] for w in workers if w in self.worker_index]
+
+    def date_indices(self, dates):
+        return [self.date_index[d] for d in dates if d in self.date_index]
+
+    def slot_indices(self, slots):
+        return [self.slot_index[s] for s in slots if s in self.slot_index]
+
+    def cell(self, key):
+        """(wi, di, si) of an id keyed cell, None if an id is not on the axes"""
+        w, d, s = key
+        try:
+            return self.worker_index[w], self.date_index[d], self.slot_index[s]
+        except (KeyError, TypeError):
+            return None
+
+    def add(self, wi, di, si, literal):
+        if not self.mask[wi, di, si]:
+            self.size += 1
+        self.literals[wi, di, si] = literal
+        self.mask[wi, di, si] = True
+
+    def fold(self, wi, di, si, value):
+        """record a cell as the constant value, without a literal"""
+        self.fixed[wi, di, si] = value
+
+    def at(self, wi, di, si):
+        """literal of a cell, None where the mask is unset"""
+        return self.literals[wi, di, si] if self.mask[wi, di, si] else None
+
+    def term(self, wi, di, si):
+        """literal of a cell, its 0 / 1 value if folded, None if the combination is not in the model"""
+        if self.mask[wi, di, si]:
+            return self.literals[wi, di, si]
+        if self.fixed[wi, di, si] >= 0:
+            return int(self.fixed[wi, di, si])
+        return None
+
+    def present(self):
+        """cells that are in the model, as a literal or folded"""
+        return self.mask | (self.fixed >= 0)
+
+    def worker_literals(self, wi, date_indices, slot_indices):
+        """literals of worker wi over the given dates and slots, date major, missing cells skipped"""
+        if not date_indices or not slot_indices:
+            return []
+        block = np.ix_(date_indices, slot_indices)
+        return list(self.literals[wi][block][self.mask[wi][block]])
+
+    def worker_terms(self, wi, date_indices, slot_indices):
+        """(literals, constant) of worker wi over the given dates and slots, constant being the folded cells set to 1"""
+        if not date_indices or not slot_indices:
+            return [], 0
+        block = np.ix_(date_indices, slot_indices)
+        return list(self.literals[wi][block][self.mask[wi][block]]), int((self.fixed[wi][block] == 1).sum())
+
+    def worker_series(self, wi, date_indices, slot_indices, constant_literal):
+        """every present cell of worker wi, date major, folded cells replaced by constant_literal(value)"""
+        series = []
+        for di in date_indices:
+            for si in slot_indices:
+                term = self.term(wi, di, si)
+                if term is None:
+                    continue
+                series.append(constant_literal(term) if isinstance(term, int) else term)
+        return series
+
+    def cover_literals(self, di, si):
+        """literals of every worker holding slot si on date di"""
+        return list(self.literals[:, di, si][self.mask[:, di, si]])
+
+    def cover_terms(self, di, si):
+        """(literals, constant) of slot si on date di, constant being the workers whose cell is folded to 1"""
+        return self.cover_literals(di, si), int((self.fixed[:, di, si] == 1).sum())
+
+    def nonzero(self):
+        """(wi, di, si) index arrays of every cell with a literal, in C order"""
+        return np.nonzero(self.mask)
+
+    # mapping view keyed by (worker, date, slot) ids
+
+    def __getitem__(self, key):
+        cell = self.cell(key)
+        if cell is None or not self.mask[cell]:
+            raise KeyError(key)
+        return self.literals[cell]
+
+    def __setitem__(self, key, literal):
+        w, d, s = key
+        self.extend([w], [d], [s])
+        self.add(self.worker_index[w], self.date_index[d], self.slot_index[s], literal)
+
+    def __contains__(self, key):
+        cell = self.cell(key)
+        return cell is not None and bool(self.mask[cell])
+
+    def get(self, key, default=None):
+        cell = self.cell(key)
+        if cell is None or not self.mask[cell]:
+            return default
+        return self.literals[cell]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for wi, di, si in zip(*self.nonzero()):
+            yield self.workers[wi], self.dates[di], self.slots[si]
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return iter(self.literals[self.mask])
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+
 class JadualModel():
 
     def __init__(
@@ -176,9 +991,20 @@ class JadualModel():
         off_day_date_list,
         tenant_id,
         sum_constraints,
-        sequence_constraints
+        sequence_constraints,
+        profile_memory=False,
+        prior_timeslots=None,
+        worker_order_seed=None,
+        carried_totals=None,
+        closes_horizon=True,
+        external_duties=None
     ):
-        self.workers_list = random.sample(workers_list, len(workers_list))
+        # identical inputs must give an identical model, so workers are sorted unless a shuffle seed is given
+        self.worker_order_seed = worker_order_seed
+        if worker_order_seed is None:
+            self.workers_list = sorted(workers_list, key=str)
+        else:
+            self.workers_list = random.Random(worker_order_seed).sample(workers_list, len(workers_list))
         self.number_of_workers = len(self.workers_list)
         self.workers_roles = workers_roles
         self.date_list = date_list
@@ -187,27 +1013,75 @@ class JadualModel():
         self.duty_types = duty_types
         self.leave_types = leave_types
         self.leaves_dependent_on_shift = []
+        self.transition_clause_counts = {}
+        self.cover_constraints = {}
+        self.excess_cover_constraints = {}
         self.off_day = off_day
         self.off_day_id = off_day["id"]
         self.off_day_date_list = off_day_date_list
         self.timeslots = []
         self.df = df
+        self.duty_index = None
         self.requests = requests_data
         self.transition_rules = transition_rules
         self.model = cp_model.CpModel()
         self.solver = cp_model.CpSolver()
-        self.work = {}
+        self.solver_profile = None
+        self.solver_parameters = {}
+        self.hint_source = None
+        # (size, min_distance) of the solution pool kept during solve, see use_solution_pool
+        self.solution_pool_options = None
+        self.solution_pool = None
+        # listener of the SolutionEvents of every solve, see use_solution_stream
+        self.solution_listener = None
+        # callback of the running search, stop_search stops it
+        self.search_callback = None
+        self.stop_requested = False
+        self.work = None
+        self.constant_literals = {}
+        # (wi, di, si) -> values of assignments known before the model is built, see resolve_fixed_assignments
+        self.fixed_assignments = {}
+        # explain_infeasibility build: hard rule groups are guarded by the assumption literals of their reasons
+        self.explain = False
+        self.assumptions = {}
+        self.explanation = None
+        self.result = None
+        self._work_layout = None
         self.schedule_data = {}
         self.request_list = []
         self.obj_bool_vars_min = []
         self.obj_bool_coeffs_min = []
         self.obj_int_vars = []
         self.obj_int_coeffs = []
+        # sum constraint periods whose hard bounds were widened to the days fixed before the build, see sum_constraint
+        self.relaxed_sum_bounds = []
+        # family name -> LinearTerms to minimize, see OBJECTIVE_FAMILIES
+        self.objective_families = {}
         self.date_prior_list = []
-        self.timeslot_list = []
+        self.timeslot_index = set()
         self.tenant_id = tenant_id
         self.sum_constraints = sum_constraints
         self.sequence_constraints = sequence_constraints
+        self.profiler = BuildProfiler(self, trace_memory=profile_memory)
+        self.prior_timeslots = prior_timeslots
+        # (worker, slot) -> assignments made before date_list by earlier rolling horizon windows
+        self.carried_totals = carried_totals
+        # False for a rolling horizon window followed by others: its MONTH sums and fairness only see a prefix
+        self.closes_horizon = closes_horizon
+        # duty ids staffed by the other worker groups of solve_by_components: their cells stay in the grid,
+        # folded to 0 as for any role ineligible worker, but their covers are left to the group holding them
+        self.external_duties = set(external_duties or ())
+        self.work = WorkGrid(self.workers_list, self.model_dates(), self.model_slots())
+
+    def run_phase(self, name, func, *args, **kwargs):
+        """run one model build phase under the build profiler"""
+        with self.profiler.phase(name):
+            return func(*args, **kwargs)
+
+    def swallow(self, exc, where):
+        """count an exception a constraint family skips over instead of failing the build"""
+        self.profiler.record_swallowed(exc, where)
+        log.debug(f'{where}: {exc}')
 
     def get_functions_dict(self):
         return {
@@ -225,22 +1099,109 @@ class JadualModel():
             "maximize_excess_covers": self.excess_covers
         }
 
+    def covered_duties(self, d):
+        """duty ids of date d whose cover this model decides"""
+        return [s for s in self.duty_id_for_dates[d] if s not in self.external_duties]
+
+    def get_duty_index(self):
+        """returns the DutyIndex of this model, building it from self.df on first use"""
+        if self.duty_index is None:
+            self.duty_index = DutyIndex(self.df, self.date_list, self.duty_id_for_dates, self.leaves_id_for_dates)
+        return self.duty_index
+
+    def model_dates(self):
+        """date axis of the work grid: the prior roster days, if transition rules need them, then date_list"""
+        prior_dates = self.prior_date_range() if self.uses_prior_roster() else []
+        return prior_dates + [d for d in self.date_list if d not in prior_dates]
+
+    def model_slots(self):
+        """slot axis of the work grid: every duty and leave id of the horizon and the prior roster"""
+        slots = []
+        for d in self.date_list:
+            slots.extend(self.duty_id_for_dates[d])
+            slots.extend(self.leaves_id_for_dates[d])
+        slots.extend(self.duty_types)
+        slots.extend(self.leave_types)
+        slots.append(self.off_day_id)
+        return list(dict.fromkeys(s for s in slots if s is not None))
+
+    def new_work(self, wi, di, si):
+        """literal of a cell, folded instead if resolve_fixed_assignments already knows its value"""
+        fixed = self.fixed_assignments.get((wi, di, si))
+        if fixed and not self.explain:
+            self.fold_work(wi, di, si, min(fixed))
+            return
+        grid = self.work
+        w, d, s = grid.workers[wi], grid.dates[di], grid.slots[si]
+        literal = self.model.NewBoolVar(f'work_{w}_{d}_{s}')
+        grid.add(wi, di, si, literal)
+        # explaining, a fixed cell keeps its literal so the fix can be assumed away
+        for value in fixed or ():
+            self.guard(self.model.Add(literal == value), 'selected_roster', w, d)
+
+    def fold_work(self, wi, di, si, value):
+        """make a cell the constant value. two sources fixing it to different values make the model infeasible,
+        as their two == constraints did"""
+        grid = self.work
+        known = {value} | self.fixed_assignments.get((wi, di, si), set())
+        if grid.fixed[wi, di, si] >= 0:
+            known.add(int(grid.fixed[wi, di, si]))
+        if len(known) > 1:
+            log.warning(f'work_{grid.workers[wi]}_{grid.dates[di]}_{grid.slots[si]} is fixed to both 0 and 1')
+            self.model.AddBoolOr([])
+        grid.fold(wi, di, si, value)
+
+    def constant_literal(self, value):
+        """shared literal fixed to value, stands in for folded cells where an encoder needs a literal"""
+        if value not in self.constant_literals:
+            self.constant_literals[value] = self.model.NewConstant(value)
+        return self.constant_literals[value]
+
+    def assumption(self, rule, worker=None, date=None, slot=None, detail=None):
+        """assumption literal of an InfeasibilityReason, shared by every constraint of the group. None
+        outside an explain_infeasibility build"""
+        if not self.explain:
+            return None
+        reason = InfeasibilityReason(rule, worker, date, slot, detail)
+        if reason not in self.assumptions:
+            self.assumptions[reason] = self.model.NewBoolVar(f'assume {reason.describe()}')
+        return self.assumptions[reason]
+
+    def guard(self, constraint, rule=None, worker=None, date=None, slot=None, detail=None):
+        """enforce constraint only under the assumption of its reason in an explain_infeasibility build"""
+        if rule is not None and self.explain:
+            constraint.OnlyEnforceIf(self.assumption(rule, worker, date, slot, detail))
+        return constraint
+
     def create_model_duties(self):
-        for w in self.workers_list:
+        """a literal for every duty a worker is role eligible for, the other duties are folded to 0"""
+        grid = self.work
+        eligible = self.role_mask()
+        for wi in range(len(grid.workers)):
             for d in self.date_list:
-                for s in self.duty_id_for_dates[d]:
-                    self.work[(w, d, s)] = self.model.NewBoolVar(f'work_{w}_{d}_{s}')
+                di = grid.date_index[d]
+                for si in grid.slot_indices(self.duty_id_for_dates[d]):
+                    if eligible[wi, di, si]:
+                        self.new_work(wi, di, si)
+                    else:
+                        self.fold_work(wi, di, si, 0)
     
     def create_model_leaves(self):
-        for w in self.workers_list:
+        # leaves carry no role, every worker is eligible for the leaves offered on a date
+        grid = self.work
+        for wi in range(len(grid.workers)):
             for d in self.date_list:
+                di = grid.date_index[d]
                 # ignored if no leaves variable
-                for l in self.leaves_id_for_dates[d]:
-                    self.work[(w, d, l)] = self.model.NewBoolVar(f'work_{w}_{d}_{l}')
+                for si in grid.slot_indices(self.leaves_id_for_dates[d]):
+                    self.new_work(wi, di, si)
     
         for d in self.date_list:
-            for l in self.leaves_id_for_dates[d]:
-                self.model.Add(sum(self.work[(w, d, l)] for w in self.workers_list) >= 0)
+            di = grid.date_index[d]
+            for si in grid.slot_indices(self.leaves_id_for_dates[d]):
+                works = grid.cover_literals(di, si)
+                if works:
+                    self.model.Add(sum(works) >= 0)
                 
 # ------------------------------------------------------------------------------------------------------------
 # Previous roster - takes into account the previous roster based on transition days
@@ -267,91 +1228,178 @@ class JadualModel():
 
 # ------------------------------------------------------------------------------------------------------------
 
+    def prior_date_range(self, days_prior_to_consider=14):
+        date_prior_start = self.date_list[0] - datetime.timedelta(days=days_prior_to_consider)
+        return [date_prior_start + datetime.timedelta(days=x) for x in range(days_prior_to_consider)]
+
     def init_previous_roster_model(self, max_len_transition_rules):
         days_prior_to_consider = 14
-        date_prior_start = self.date_list[0] - datetime.timedelta(days=days_prior_to_consider)
-        date_prior_end = self.date_list[0] - datetime.timedelta(days=1)
-        self.date_prior_list = [date_prior_start + datetime.timedelta(days=x) for x in range(days_prior_to_consider)]
+        self.date_prior_list = self.prior_date_range(days_prior_to_consider)
+        date_prior_start = self.date_prior_list[0]
         
         print(date_prior_start)
         print(days_prior_to_consider)
         print(self.date_prior_list)
         
-        for w in self.workers_list:
-            for d in self.date_prior_list:
-                for s in self.duty_types:
-                    self.work[(w, d, s)] = self.model.NewBoolVar(f'work_{w}_{d}_{s}')
-                    
-                # ignored if no leaves variable
-                for l in self.leave_types:
-                    self.work[(w, d, l)] = self.model.NewBoolVar(f'work_{w}_{d}_{l}')
+        # the prior days get no literals, add_timeslots_to_model folds them to the published roster
+        self.work.extend(dates=self.date_prior_list)
     
-    def get_prior_timeslots(self):
-        start_date = self.date_prior_list[0].strftime('%Y-%m-%d')
+    def load_prior_timeslots(self, date_prior_list=None):
+        """timeslots of the days before the horizon, queried once and kept in self.prior_timeslots.
+        timeslots handed in by the caller, e.g. a benchmark or the previous rolling window, are used as is"""
+        if self.prior_timeslots is not None:
+            return self.prior_timeslots
+        date_prior_list = date_prior_list or self.prior_date_range()
+        start_date = date_prior_list[0].strftime('%Y-%m-%d')
         try:
-            end_date = self.date_prior_list[-1].strftime('%Y-%m-%d')
+            end_date = date_prior_list[-1].strftime('%Y-%m-%d')
         except Exception as e:
             end_date = start_date
+            self.swallow(e, 'get_prior_timeslots')
         print(f'we are considering date from {start_date} to {end_date}')
         params_timeslots = {'tenantId': self.tenant_id, 'between': [f"{start_date}", f"{end_date}"]}
         timeslots_data = query(timeslotsByTenantId, params_timeslots)
-        self.timeslot = timeslots_data["timeslotsByTenantId"]["items"]
+        self.prior_timeslots = timeslots_data["timeslotsByTenantId"]["items"]
+        return self.prior_timeslots
+
+    def get_prior_timeslots(self):
+        self.timeslots = self.load_prior_timeslots(self.date_prior_list)
         self.generate_timeslot_list()
         
     def generate_timeslot_list(self):
+        """parse prior timeslots once into a (worker, date, slot) index so each lookup is O(1)"""
+        self.timeslot_index = set()
         for timeslot in self.timeslots:
             worker_ts = timeslot["workerId"]
-            date_ts = datetime.strptime(timeslot["start"], '%Y-%m-%d').date()
+            date_ts = to_date(timeslot["start"])
             if timeslot["type"] == "Duty":
-                timeslot_ref = (worker_ts, date_ts, timeslot["dutyId"])
+                slot_ts = timeslot["dutyId"]
             elif timeslot["type"] == "Leave":
-                timeslot_ref = (worker_ts, date_ts, timeslot["leaveId"])
-            self.timeslot_list.append(timeslot_ref)
+                slot_ts = timeslot["leaveId"]
+            else:
+                continue
+            self.timeslot_index.add((worker_ts, date_ts, slot_ts))
             
     def timeslot_match(self, _timeslot):
-        return _timeslot in self.timeslot_list
+        w, d, s = _timeslot
+        return (w, to_date(d), s) in self.timeslot_index
         
     def add_timeslots_to_model(self):
-        for w in self.workers_list:
-            for d in self.date_prior_list:
-                for s in self.duty_types:
-                    if self.timeslot_match((w, d, s)):
-                        self.model.Add(self.work[(w, d, s)] == 1)
-                    else:
-                        self.model.Add(self.work[(w, d, s)] == 0)
-                for l in self.leave_types:
-                    if self.timeslot_match((w, d, l)):
-                        self.model.Add(self.work[(w, d, l)] == 1)
-                    else:
-                        self.model.Add(self.work[(w, d, l)] == 0)
+        """fold every duty and leave of the prior days to 1 if it is in the published roster, else to 0"""
+        grid = self.work
+        prior_dates = grid.date_indices(self.date_prior_list)
+        prior_slots = grid.slot_indices(self.duty_types + self.leave_types)
+        # prior timeslots as a worked mask over the same indices
+        day_index = {to_date(grid.dates[di]): di for di in prior_dates}
+        worked = np.zeros(grid.mask.shape, dtype=bool)
+        for w, day, s in self.timeslot_index:
+            if w in grid.worker_index and day in day_index and s in grid.slot_index:
+                worked[grid.worker_index[w], day_index[day], grid.slot_index[s]] = True
+        for wi in range(len(grid.workers)):
+            for di in prior_dates:
+                for si in prior_slots:
+                    self.fold_work(wi, di, si, int(worked[wi, di, si]))
                             
+    def uses_prior_roster(self):
+        """transition rules look back over the prior days, and so do the sequence constraints of a rolling horizon
+        window, whose runs go on from the days committed by the window before"""
+        if bool(self.transition_rules) and max(len(rule_set["sequence"]) for rule_set in self.transition_rules) > 0:
+            return True
+        return bool(self.sequence_constraints) and self.carried_totals is not None
+
     def build_previous_roster(self):
-        if self.transition_rules:
-            max_len_transition_rules = max(len(rule_set["sequence"]) for rule_set in self.transition_rules)
-            if max_len_transition_rules > 0:
-                self.init_previous_roster_model(max_len_transition_rules)
-                self.get_prior_timeslots()
-                self.add_timeslots_to_model()
+        if self.uses_prior_roster():
+            max_len_transition_rules = max((len(rule_set["sequence"]) for rule_set in self.transition_rules or []), default=0)
+            self.init_previous_roster_model(max_len_transition_rules)
+            self.get_prior_timeslots()
+            self.add_timeslots_to_model()
                 
     def use_current_selected_roster(self, selected_roster=None):
         if selected_roster is None:
             selected_roster = []
+        grid = self.work
         for slot in selected_roster:
             # s = slot["leave_id"] if slot["type"] == "Leave" else slot["duty_id"]
             w = slot["worker_id"]
             d = slot["start"]
-            if slot["type"] == "Leave":
-                for l in self.leave_types:
-                    try:
-                        self.model.Add(self.work[(w, d, l)] == 0)
-                    except Exception as e:
-                        pass
-            else:
-                for s in self.duty_types:
-                    try:
-                        self.model.Add(self.work[(w, d, s)] == 0)
-                    except Exception as e:
-                        pass
+            if w not in grid.worker_index or d not in grid.date_index:
+                continue
+            wi, di = grid.worker_index[w], grid.date_index[d]
+            slot_types = self.leave_types if slot["type"] == "Leave" else self.duty_types
+            for si in grid.slot_indices(slot_types):
+                self.fix_work(wi, di, si, 0)
+
+# ------------------------------------------------------------------------------------------------------------
+#  Fixed assignments - resolved before any literal is created
+# ------------------------------------------------------------------------------------------------------------
+
+    def fix_work(self, wi, di, si, value):
+        """fix a cell to value. before the build it is folded once created, a cell that already has a literal
+        gets a == constraint"""
+        grid = self.work
+        if grid.mask[wi, di, si]:
+            self.guard(self.model.Add(grid.literals[wi, di, si] == value), 'selected_roster', grid.workers[wi], grid.dates[di])
+        elif grid.fixed[wi, di, si] >= 0:
+            self.fold_work(wi, di, si, value)
+        else:
+            self.fixed_assignments.setdefault((wi, di, si), set()).add(value)
+
+    def creates_cell(self, w, d, s):
+        """whether the build gives (w, d, s) a literal or folds it"""
+        if w not in self.work.worker_index:
+            return False
+        if d in self.duty_id_for_dates and s in self.duty_id_for_dates[d]:
+            return True
+        if d in self.leaves_id_for_dates and s in self.leaves_id_for_dates[d]:
+            return True
+        return self.uses_prior_roster() and d in self.prior_date_range() and s in self.duty_types + self.leave_types
+
+    def fix_request_cell(self, key, value):
+        cell = self.work.cell(key)
+        if cell is not None:
+            self.fix_work(*cell, value)
+
+    def request_fixes(self):
+        """the == 0 constraints populate_requests would add: NEGATE requests and the other duties and off day
+        of an AFFIRM shift request"""
+        for request in self.requests:
+            if request['type'] != "Shift":
+                try:
+                    worker, day, slot, request_type, strategy = self.parse_requests_to_model_format(request)
+                except Exception:
+                    # populate_requests reports it
+                    continue
+                if strategy == "NEGATE":
+                    self.fix_request_cell((worker, day, slot), 0)
+                continue
+            duties, other_duties = self.parse_shift_requests_to_model_format(request)
+            if request["strategy"] == "AFFIRM":
+                off_day_negate = set()
+                for worker, day, slot, request_type, strategy in other_duties:
+                    if not self.creates_cell(worker, day, slot):
+                        continue
+                    self.fix_request_cell((worker, day, slot), 0)
+                    if (worker, day) not in off_day_negate:
+                        self.fix_request_cell((worker, day, self.off_day_id), 0)
+                        off_day_negate.add((worker, day))
+            for worker, day, slot, request_type, strategy in duties:
+                if strategy == "NEGATE":
+                    self.fix_request_cell((worker, day, slot), 0)
+
+    def resolve_fixed_assignments(self, selected_roster=None, include_requests=True):
+        """Collect the assignments known before the model is built.
+
+        The selected roster slots and, with include_requests, NEGATE requests and AFFIRM
+        shift exclusions become constants as their cells are created, together with the
+        prior roster days folded by add_timeslots_to_model. Sums take them as offsets and
+        transition clauses they satisfy are dropped, instead of each being a full literal
+        with a == constraint.
+        """
+        self.use_current_selected_roster(selected_roster)
+        if include_requests and not self.explain:
+            # explaining, populate_requests adds them as constraints guarded per request
+            self.request_fixes()
+        log.info(f'{len(self.fixed_assignments)} assignments fixed before the build')
                     
                 
 # ------------------------------------------------------------------------------------------------------------
@@ -381,20 +1429,28 @@ class JadualModel():
             soft_max = seq_constraint["softMax"]
             hard_max = seq_constraint["hardMax"]
             max_cost = seq_constraint["maxCost"]
+            encoding = seq_constraint.get("encoding") or "SPAN"
+            add_sequence_constraint = SEQUENCE_ENCODINGS[encoding]
 
             duties = duties_by_shift[slot_id] if slot_type == "Shift" else [slot_id]
-
-            for w in self.workers_list:
-                works = []
-                for d in self.date_list:
-                    for s in duties:
-                        try:
-                            works.append(self.work[(w, d, s)])
-                        except Exception as e:
-                            print(e)
+            grid = self.work
+            date_indices = grid.date_indices(self.date_list)
+            slot_indices = grid.slot_indices(duties)
+
+            for wi, w in enumerate(grid.workers):
+                # folded cells keep their position, a missing day must not join two runs
+                works = self.sequence_history(wi, slot_indices, hard_max)
+                works += grid.worker_series(wi, date_indices, slot_indices, self.constant_literal)
+                if self.explain:
+                    # only the hard bounds can conflict, as plain spans guarded per worker
+                    enforcement = self.assumption('sequence', w, slot=slot_id, detail=f'{hard_min}-{hard_max} days')
+                    add_soft_sequence_constraint(
+                        self.model, works, hard_min, hard_min, 0, hard_max, hard_max, 0,
+                        f'sequence_constraint({w}, {slot_id})', enforcement)
+                    continue
                 
                 try:
-                    variables, coeffs = add_soft_sequence_constraint(
+                    variables, coeffs = add_sequence_constraint(
                         self.model,
                         works,
                         hard_min,
@@ -406,8 +1462,28 @@ class JadualModel():
                         f'sequence_constraint({w}, {slot_id})')
                     self.obj_bool_vars_min.extend(variables)
                     self.obj_bool_coeffs_min.extend(coeffs)
+                    self.objective_family('sequences').extend(variables, coeffs)
                 except Exception as e:
-                    print(e)
+                    self.swallow(e, 'implement_slot_sequence_constraints')
+
+    def sequence_history(self, wi, slot_indices, hard_max):
+        """constant literals of the run worker wi is on when a rolling horizon window starts: the trailing 1s of
+        the prior days, at most hard_max of them, behind the 0 that began the run. the runs of the published
+        roster before a single model are not looked at"""
+        if self.carried_totals is None or not self.date_prior_list:
+            return []
+        grid = self.work
+        prior = grid.worker_series(wi, grid.date_indices(self.date_prior_list), slot_indices, int)
+        run = 0
+        while run < min(hard_max, len(prior)) and prior[-run - 1] == 1:
+            run += 1
+        if run == 0:
+            return []
+        history = [1] * run
+        if run < hard_max and run < len(prior):
+            # the 0 the run began after, so a run shorter than hard_min has to go on
+            history.insert(0, 0)
+        return [self.constant_literal(value) for value in history]
 
 # ------------------------------------------------------------------------------------------------------------
 #  Soft and hard sum sequences
@@ -436,52 +1512,89 @@ class JadualModel():
             if slot_type == "Duty":
                 duties = [slot_id]
             else:
-                duties = utils.filter_duties_by_shift(self.df, slot_id)
-            for w in self.workers_list:
-                if sum_type == "MONTH":
+                duties = self.get_duty_index().duties_for_shift(slot_id)
+            grid = self.work
+            slot_indices = grid.slot_indices(duties)
+            if sum_type == "MONTH" and not self.closes_horizon:
+                # later windows still add to the month, a prefix can only break its maxima
+                log.info(f'sum constraint {slot_id} MONTH: minimum {hard_min} is left to the last rolling window')
+                hard_min, soft_min, min_cost = 0, 0, 0
+            if sum_type == "MONTH":
+                if self.carried_totals is not None:
+                    # rolling horizon window: earlier windows are counted through the running totals,
+                    # their last days are also in date_prior_list so only this window's dates are summed
+                    periods = [('1_month', grid.date_indices(self.date_list))]
+                else:
+                    periods = [('1_month', grid.date_indices(all_dates))]
+            else:
+                periods = list(enumerate(grid.date_indices(week) for week in utils.chunk(all_dates, 7)))
+            relaxed_before = len(self.relaxed_sum_bounds)
+            for wi, w in enumerate(grid.workers):
+                offset = 0
+                if sum_type == "MONTH" and self.carried_totals is not None:
+                    offset = sum(self.carried_totals.get((w, duty), 0) for duty in duties)
+                for period, date_indices in periods:
                     self.sum_constraint(
-                        w, 
-                        duties,
-                        all_dates,
-                        '1_month',
+                        wi, 
+                        slot_indices,
+                        date_indices,
+                        period,
                         hard_min, 
                         soft_min, 
                         min_cost, 
                         soft_max,
                         hard_max, 
-                        max_cost
+                        max_cost,
+                        offset
                     )
-                else:
-                    weeks = utils.chunk(all_dates, 7)
-                    for index, week in enumerate(weeks):
-                        self.sum_constraint(
-                            w, 
-                            duties,
-                            week,
-                            index,
-                            hard_min, 
-                            soft_min, 
-                            min_cost, 
-                            soft_max,
-                            hard_max, 
-                            max_cost
-                        )
+            relaxed = len(self.relaxed_sum_bounds) - relaxed_before
+            if relaxed:
+                log.warning(
+                    f'sum constraint {slot_id} {sum_type} {hard_min}-{hard_max}: hard bounds widened in {relaxed} '
+                    f'worker periods whose fixed days already fall outside them, see relaxed_sum_bounds'
+                )
                             
     def sum_constraint(
         self,
-        w, 
-        duties, 
-        date_list, 
+        wi, 
+        slot_indices, 
+        date_indices, 
         date_list_index,
         hard_min, 
         soft_min, 
         min_cost, 
         soft_max,
         hard_max, 
-        max_cost
+        max_cost,
+        offset = 0
     ):
+        grid = self.work
+        w = grid.workers[wi]
+        duties = [grid.slots[si] for si in slot_indices]
         try:
-            works = [self.work[w, duty, d] for duty in duties for d in date_list]
+            works, constant = grid.worker_terms(wi, date_indices, slot_indices)
+            if not works:
+                # every day of the period is fixed, e.g. a week of the prior roster: nothing left to decide
+                return
+            offset += constant
+            # the fixed days (prior roster, selected roster, role ineligible cells) can not be undone,
+            # the bounds only limit what the free days add to them
+            configured = (hard_min, hard_max)
+            hard_max = max(hard_max, offset)
+            hard_min = min(hard_min, offset + len(works))
+            if (hard_min, hard_max) != configured:
+                self.relaxed_sum_bounds.append({
+                    'worker': w, 'slots': duties, 'period': date_list_index, 'fixed': offset, 'free': len(works),
+                    'configured': configured, 'applied': (hard_min, hard_max),
+                })
+            if self.explain:
+                # only the hard bounds can conflict, guarded per worker and period
+                self.guard(
+                    LinearTerms(works, constant=offset).add_bounded(self.model, hard_min, hard_max),
+                    'sum', w, grid.dates[date_indices[0]] if len(date_indices) else None, ','.join(map(str, duties)),
+                    f'{hard_min}-{hard_max}'
+                )
+                return
             prefix = f'weekly_sum_constraint({w}, {duties}, {date_list_index})'
             variables, coeffs = add_soft_sum_constraint(
                 self.model, 
@@ -492,20 +1605,45 @@ class JadualModel():
                 soft_max,
                 hard_max, 
                 max_cost, 
-                prefix
+                prefix,
+                offset
             )
             self.obj_int_vars.extend(variables)
             self.obj_int_coeffs.extend(coeffs)
+            self.objective_family('sums').extend(variables, coeffs)
         except Exception as e:
-            print(e)
+            self.swallow(e, 'sum_constraint')
 # ------------------------------------------------------------------------------------------------------------
 # OFFDAY
 # ------------------------------------------------------------------------------------------------------------
                     
     def create_offdays(self):
-        for w in self.workers_list:
-            for d in self.off_day_date_list:
-                self.work[(w, d, self.off_day_id)] = self.model.NewBoolVar(f'work_{w}_{d}_{self.off_day_id}')
+        grid = self.work
+        grid.extend(dates=self.off_day_date_list, slots=[self.off_day_id])
+        si = grid.slot_index[self.off_day_id]
+        for wi in range(len(grid.workers)):
+            for di in grid.date_indices(self.off_day_date_list):
+                self.new_work(wi, di, si)
+
+    def off_day_weeks(self):
+        """date indices of every period the off day rules count over, following the off day daily/weekend/weekday flag"""
+        if self.off_day['daily']:
+            weeks = utils.chunk(self.off_day_date_list, 7)
+        elif self.off_day["weekend"]:
+            _off_day_date_list = utils.group_dates_by_weekend(self.off_day_date_list)
+            weeks = utils.remove_duplicates(_off_day_date_list)
+        elif self.off_day["weekday"]:
+            weeks = utils.chunk(self.off_day_date_list, 5)
+        else:
+            weeks = []
+        return [self.work.date_indices(a_week) for a_week in weeks]
+
+    def off_day_literals(self):
+        """per worker index, the off day literals of each off_day_weeks period"""
+        grid = self.work
+        off_slot = grid.slot_indices([self.off_day_id])
+        weeks = self.off_day_weeks()
+        return [[grid.worker_literals(wi, a_week, off_slot) for a_week in weeks] for wi in range(len(grid.workers))]
     
     def number_off_day_per_worker_per_roster(self, params = None):
         if params is None:
@@ -514,50 +1652,33 @@ class JadualModel():
         # self.create_offdays()
         
         min_per_week, max_per_week = params[0], params[1]
-        for w in self.workers_list:
-            if self.off_day['daily']:
-                for a_week in utils.chunk(self.off_day_date_list, 7):
-                    self.model.Add(sum(self.work[(w, d, self.off_day_id)] for d in a_week) <= max_per_week)
-                    self.model.Add(sum(self.work[(w, d, self.off_day_id)] for d in a_week) >= min_per_week)
-            elif self.off_day["weekend"]:
-                _off_day_date_list = utils.group_dates_by_weekend(self.off_day_date_list)
-                _off_day_by_week = utils.remove_duplicates(_off_day_date_list)
-                for a_week in _off_day_by_week:
-                    self.model.Add(sum(self.work[(w, d, self.off_day_id)] for d in a_week) <= max_per_week)
-                    self.model.Add(sum(self.work[(w, d, self.off_day_id)] for d in a_week) >= min_per_week)
-            elif self.off_day["weekday"]:
-                for a_week in utils.chunk(self.off_day_date_list, 5):
-                    self.model.Add(sum(self.work[(w, d, self.off_day_id)] for d in a_week) <= max_per_week)
-                    self.model.Add(sum(self.work[(w, d, self.off_day_id)] for d in a_week) >= min_per_week)
+        grid = self.work
+        week_starts = [grid.dates[a_week[0]] if len(a_week) else None for a_week in self.off_day_weeks()]
+        for wi, weeks in enumerate(self.off_day_literals()):
+            for works, week_start in zip(weeks, week_starts):
+                if not works:
+                    continue
+                self.guard(
+                    LinearTerms(works).add_bounded(self.model, min_per_week, max_per_week),
+                    'off_days', grid.workers[wi], week_start, detail=f'{min_per_week}-{max_per_week}'
+                )
+
+    def off_days_objective(self, coeff):
+        """off days as an objective family, it only takes effect as a stage of solve_lexicographic.
+        the family takes one direction once, a second call would cancel or double its terms"""
+        family = self.objective_family('off_days')
+        if family.variables:
+            raise ValueError('the off_days objective is already set, use one of minimize_off_days / maximize_off_days once')
+        for weeks in self.off_day_literals():
+            for works in weeks:
+                family.extend(works, [coeff] * len(works))
 
     def minimize_off_days(self):
-        for w in self.workers_list:
-            if self.off_day['daily']:
-                for a_week in utils.chunk(self.off_day_date_list, 7):
-                    self.model.Minimize(sum(self.work[(w, d, self.off_day_id)] for d in a_week))
-            elif self.off_day["weekend"]:
-                _off_day_date_list = utils.group_dates_by_weekend(self.off_day_date_list)
-                _off_day_by_week = utils.remove_duplicates(_off_day_date_list)
-                for a_week in _off_day_by_week:
-                    self.model.Minimize(sum(self.work[(w, d, self.off_day_id)] for d in a_week))
-            elif self.off_day["weekday"]:
-                for a_week in utils.chunk(self.off_day_date_list, 5):
-                    self.model.Minimize(sum(self.work[(w, d, self.off_day_id)] for d in a_week))
-            
+        self.off_days_objective(1)
+
     def maximize_off_days(self):
-        for w in self.workers_list:
-            if self.off_day['daily']:
-                for a_week in utils.chunk(self.off_day_date_list, 7):
-                    self.model.Maximize(sum(self.work[(w, d, self.off_day_id)] for d in a_week))
-            elif self.off_day["weekend"]:
-                _off_day_date_list = utils.group_dates_by_weekend(self.off_day_date_list)
-                _off_day_by_week = utils.remove_duplicates(_off_day_date_list)
-                for a_week in _off_day_by_week:
-                    self.model.Maximize(sum(self.work[(w, d, self.off_day_id)] for d in a_week))
-            elif self.off_day["weekday"]:
-                for a_week in utils.chunk(self.off_day_date_list, 5):
-                    self.model.Maximize(sum(self.work[(w, d, self.off_day_id)] for d in a_week))
-                    
+        self.off_days_objective(-1)
+
 # ------------------------------------------------------------------------------------------------------------
 # Fairness
 # ------------------------------------------------------------------------------------------------------------
@@ -565,29 +1686,42 @@ class JadualModel():
     def fairness_allocation(self):
         fairshift = {}
         sum_of_shifts = {}
-        num_days = len(self.date_list) 
-        for w in self.workers_list:
-            for s in self.duty_types:
-                sum_of_shifts[(w, s)] = self.model.NewIntVar(0, num_days, f'sum_of_shifts_{w}_{s}')
-                shift_list = []
-                for d in self.date_list:
-                    try:
-                        shift_list.append(self.work[(w, d, s)])
-                    except Exception as e:
-                        pass
-                self.model.Add(sum_of_shifts[(w, s)] == sum(shift_list))
+        carried_totals = self.carried_totals or {}
+        num_days = len(self.date_list) + max(carried_totals.values(), default=0)
+        grid = self.work
+        date_indices = grid.date_indices(self.date_list)
+        worker_indices = range(len(grid.workers))
+        duty_slots = grid.slot_indices(self.duty_types)
+        for wi in worker_indices:
+            w = grid.workers[wi]
+            for si in duty_slots:
+                s = grid.slots[si]
+                sum_of_shifts[(wi, si)] = self.model.NewIntVar(0, num_days, f'sum_of_shifts_{w}_{s}')
+                shift_list, constant = grid.worker_terms(wi, date_indices, [si])
+                # fairness is over the whole horizon, including the windows solved before this one
+                terms = LinearTerms(shift_list, constant=constant + carried_totals.get((w, s), 0))
+                terms.add(sum_of_shifts[(wi, si)], -1)
+                terms.add_bounded(self.model, 0, 0)
                                 
-        for s in self.duty_types:
+        for si in duty_slots:
+            s = grid.slots[si]
             try:
                 min_fair_shift = self.model.NewIntVar(0, num_days, f'min_fair_shift_{s}')
                 max_fair_shift = self.model.NewIntVar(0, num_days, f'max_fair_shift_{s}')
-                self.model.AddMinEquality(min_fair_shift, [sum_of_shifts[(w, s)] for w in self.workers_list])
-                self.model.AddMaxEquality(max_fair_shift, [sum_of_shifts[(w, s)] for w in self.workers_list]) 
+                self.model.AddMinEquality(min_fair_shift, [sum_of_shifts[(wi, si)] for wi in worker_indices])
+                self.model.AddMaxEquality(max_fair_shift, [sum_of_shifts[(wi, si)] for wi in worker_indices]) 
 
-                self.model.Add(max_fair_shift - min_fair_shift <= 1)
+                if self.closes_horizon:
+                    self.guard(self.model.Add(max_fair_shift - min_fair_shift <= 1), 'fairness', slot=s)
+                else:
+                    # the windows still to come can even the totals out, keep the spread small instead of within 1
+                    self.obj_int_vars.extend([max_fair_shift, min_fair_shift])
+                    self.obj_int_coeffs.extend([1, -1])
+                # as a lexicographic stage, close the spread further where the cover allows it
+                self.objective_family('fairness').extend([max_fair_shift, min_fair_shift], [1, -1])
 
             except Exception as e:
-                pass
+                self.swallow(e, 'fairness_allocation')
                 
 # ------------------------------------------------------------------------------------------------------------
 # 1 worker 1 shift
@@ -601,48 +1735,85 @@ class JadualModel():
     def one_worker_one_shift_duty(self):
         """constraint each worker only work 1 day 1 shift"""
         print("constraint each worker only work 1 day 1 shift")
-        for w in self.workers_list:
-            for d in self.date_list:
-                all_slot_variables = []
-                all_slot_variables.extend(self.duty_id_for_dates[d])
-                self.model.AddAtMostOne(self.work[(w, d, s)] for s in all_slot_variables)
+        grid = self.work
+        days = [(grid.date_index[d], grid.slot_indices(self.duty_id_for_dates[d])) for d in self.date_list]
+        for wi in range(len(grid.workers)):
+            for di, slot_indices in days:
+                self.model.AddAtMostOne(grid.worker_literals(wi, [di], slot_indices))
     
     def one_worker_one_shift(self):
         """constraint each worker only work 1 day 1 shift"""
         print("constraint each worker only work 1 day 1 shift")
-        for w in self.workers_list:
-            for d in self.date_list:
-                all_slot_variables = []
-                all_slot_variables.extend(self.leaves_id_for_dates[d])
-                all_slot_variables.extend(self.duty_id_for_dates[d])
-                self.model.AddAtMostOne(self.work[(w, d, s)] for s in all_slot_variables)
+        grid = self.work
+        days = [
+            (grid.date_index[d], grid.slot_indices(self.leaves_id_for_dates[d] + self.duty_id_for_dates[d]))
+            for d in self.date_list
+        ]
+        for wi in range(len(grid.workers)):
+            for di, slot_indices in days:
+                works = grid.worker_literals(wi, [di], slot_indices)
+                if self.explain:
+                    # an at most one constraint takes no enforcement literal, the linear form does
+                    if len(works) > 1:
+                        self.guard(
+                            LinearTerms(works).add_bounded(self.model, 0, 1),
+                            'one_shift_per_day', grid.workers[wi], grid.dates[di]
+                        )
+                    continue
+                self.model.AddAtMostOne(works)
 
 # ------------------------------------------------------------------------------------------------------------
 # Roles
 # ------------------------------------------------------------------------------------------------------------
 
+    def role_eligible(self, w, d, s):
+        """whether worker w may take duty s on date d: workers without roles and duties without a role match anything"""
+        if w not in self.workers_roles:
+            return True
+        duty_index = self.get_duty_index()
+        if (d, s) not in duty_index.roles:
+            return True
+        return duty_index.role(d, s) in self.workers_roles[w]
+
+    def role_mask(self):
+        """worker x date x slot array of role_eligible over the work grid axes, True wherever no role applies"""
+        grid = self.work
+        eligible = np.ones(grid.mask.shape, dtype=bool)
+        has_role = {}
+        for (d, s), role in self.get_duty_index().roles.items():
+            if d not in grid.date_index or s not in grid.slot_index:
+                continue
+            if role not in has_role:
+                has_role[role] = np.array(
+                    [w not in self.workers_roles or role in self.workers_roles[w] for w in grid.workers], dtype=bool
+                )
+            eligible[:, grid.date_index[d], grid.slot_index[s]] = has_role[role]
+        return eligible
+
     def match_worker_role_and_shift_hard(self):
         """constraint to match role with shift. create an intermediate variable and enforce if"""
         print("constraint to match role with shift. create an intermediate variable and enforce if")
-        for w in self.workers_list:
-            for d in self.date_list:
-                for s in self.duty_id_for_dates[d]:
-                    try:
-                        duty_role = utils.query_df(self.df, d, s, 'role_id')
-                        if duty_role not in self.workers_roles[w]:
-                            self.model.Add(self.work[(w, d, s)] == 0)
-                    except:
-                        log.info("slot has no duty")
+        # create_model_duties folds ineligible duties to 0, this only catches literals created by other means
+        grid = self.work
+        horizon = np.zeros(len(grid.dates), dtype=bool)
+        horizon[grid.date_indices(self.date_list)] = True
+        ineligible = grid.mask & ~self.role_mask() & horizon[None, :, None]
+        for wi, di, si in zip(*np.nonzero(ineligible)):
+            self.model.Add(grid.literals[wi, di, si] == 0)
     
     def match_worker_role_and_shift_soft(self):
         int_role_no_match_vars = {}
-        for w in self.workers_list:
+        duty_index = self.get_duty_index()
+        grid = self.work
+        for wi, w in enumerate(grid.workers):
             for d in self.date_list:
+                di = grid.date_index[d]
                 for s in self.duty_id_for_dates[d]:
-                    duty_role = utils.query_df(self.df, d, s, 'role_id')
-                    if duty_role not in self.workers_roles[w]:
-                        int_role_no_match_vars[(w, d, s)] = self.model.NewBoolVar(f'role_{w}_{d}_{s}')
-                        self.model.Add(self.work[(w, d, s)] == 0).OnlyEnforceIf(int_role_no_match_vars[(w, d, s)])
+                    duty_role = duty_index.role(d, s)
+                    work = grid.at(wi, di, grid.slot_index[s])
+                    if work is not None and duty_role not in self.workers_roles[w]:
+                        int_role_no_match_vars[(wi, di, s)] = self.model.NewBoolVar(f'role_{w}_{d}_{s}')
+                        self.model.Add(work == 0).OnlyEnforceIf(int_role_no_match_vars[(wi, di, s)])
                         
 # ------------------------------------------------------------------------------------------------------------
 # Requests - needs to happen 1st before populating solved model
@@ -670,6 +1841,7 @@ class JadualModel():
     def populate_model_with_request(self, weight, work):
         self.obj_bool_vars_min.append(work)
         self.obj_bool_coeffs_min.append(weight)
+        self.objective_family('requests').add(work, weight)
     
     def parse_requests_to_model_format(self, request):
         worker = request["workerId"]
@@ -691,8 +1863,9 @@ class JadualModel():
         worker = request["workerId"]
         day = parse_ISO8601_date_to_datetime(request["date"]).date()
         request_type = request["type"]
-        _duties = utils.filter_duties_by_shift(self.df, request["shiftId"])
-        _other_duties = utils.filter_duties_by_not_shift(self.df, request["shiftId"])
+        duty_index = self.get_duty_index()
+        _duties = duty_index.duties_for_shift(request["shiftId"])
+        _other_duties = duty_index.duties_not_in_shift(request["shiftId"])
         
         for duty_id in _duties:
             _payload = (worker, day, duty_id, request_type, strategy)
@@ -704,48 +1877,69 @@ class JadualModel():
             
         return duties, other_duties
 
+    def request_term(self, key):
+        """work term of a requested (worker, date, slot), None if it is not in the model"""
+        cell = self.work.cell(key)
+        return None if cell is None else self.work.term(*cell)
+
+    def negate_request_term(self, work, reason):
+        """work == 0 for a request, reason the guard arguments of the request in an explain_infeasibility build"""
+        if not isinstance(work, int):
+            self.guard(self.model.Add(work == 0), *reason)
+        elif work and self.explain:
+            # the request fixes were not folded, a cell folded to 1 conflicts with it
+            self.guard(self.model.AddBoolOr([]), *reason)
+
+    def add_request_term(self, work, strategy, reason=()):
+        if strategy == "NEGATE":
+            # a folded cell is already resolved by request_fixes
+            self.negate_request_term(work, reason)
+        elif isinstance(work, int):
+            # folded cell: a reward is a constant
+            if work:
+                self.populate_model_with_request(-50, self.constant_literal(1))
+        else:
+            self.populate_model_with_request(-50, work)
+
     def populate_requests(self):
         """populate all approved request to true, then false for all workers who did not apply for the rest days and of leave types"""
         print("populating requests")
+        grid = self.work
         
         for request in self.requests:
             if request['type'] != "Shift":
                 try:
                     worker, day, slot, request_type, strategy = self.parse_requests_to_model_format(request)
-                    work = self.work[(worker, day, slot)]
-                    self.request_list.append((worker, day, slot))
-                    self.schedule_data.setdefault(day, {})
-                    if strategy == "NEGATE":
-                        self.model.Add(self.work[(worker, day, slot)] == 0)
-                    else:
-                        self.populate_model_with_request(-50, work)
                 except Exception as e:
-                    print(e)
+                    self.swallow(e, 'populate_requests')
+                    continue
+                work = self.request_term((worker, day, slot))
+                if work is None:
+                    continue
+                self.request_list.append((worker, day, slot))
+                self.schedule_data.setdefault(day, {})
+                self.add_request_term(work, strategy, ('request', worker, day, slot, f'{request_type} {strategy}'))
                     
             else:
                 duties, other_duties = self.parse_shift_requests_to_model_format(request)
+                reason = ('request', request["workerId"], to_date(request["date"]), request["shiftId"], f'Shift {request["strategy"]}')
                 if request["strategy"] == "AFFIRM":
-                    off_day_negate = []
-                    for duty in other_duties:
-                        try:
-                            worker, day, slot, request_type, strategy = duty
-                            self.model.Add(self.work[(worker, day, slot)] == 0)
-                            if (worker, day) not in off_day_negate:
-                                self.model.Add(self.work[(worker, day, self.off_day_id)] == 0)
-                                off_day_negate.append((worker, day))
-                        except Exception as e:
-                            print(e)
+                    off_day_negate = set()
+                    for worker, day, slot, request_type, strategy in other_duties:
+                        work = self.request_term((worker, day, slot))
+                        if work is None:
+                            continue
+                        self.negate_request_term(work, reason)
+                        off_day = grid.get((worker, day, self.off_day_id))
+                        if off_day is not None and (worker, day) not in off_day_negate:
+                            self.guard(self.model.Add(off_day == 0), *reason)
+                            off_day_negate.add((worker, day))
                         
-                for duty in duties:
-                    try:
-                        worker, day, slot, request_type, strategy = duty
-                        work = self.work[(worker, day, slot)]
-                        if strategy == "NEGATE":
-                            self.model.Add(self.work[(worker, day, slot)] == 0)
-                        else:
-                            self.populate_model_with_request(-50, work)                           
-                    except Exception as e:
-                        print(e)
+                for worker, day, slot, request_type, strategy in duties:
+                    work = self.request_term((worker, day, slot))
+                    if work is None:
+                        continue
+                    self.add_request_term(work, strategy, reason)                           
     
 # ------------------------------------------------------------------------------------------------------------
 #  Transitions    
@@ -754,85 +1948,78 @@ class JadualModel():
 # {'sequence': [{'type':'shift', 'id':'6e2db059-b7f1-477a-b4b7-8c1957885897', 'day': 0}, {'type':'shift', 'id':'21c993d9-b088-45b1-b859-d53f019cc94e', 'day': 1}], 'cost': 0, 'strategy': 'never'},
 # {'sequence': [{'type':'shift', 'id':'21c993d9-b088-45b1-b859-d53f019cc94e', 'day': 0}, {'type':'shift', 'id':'6e2db059-b7f1-477a-b4b7-8c1957885897', 'day': 1}], 'cost': 0, 'strategy': 'never'}
 
-    def iterate_rules_for_each_worker(self, w, d, duties_by_shift):
-        all_transition = []
-        for rule_set in self.transition_rules:
-            counter = 0
-            single_transition = []
-            slots = []
+    def resolve_rule_slots(self, rule, duties_by_shift):
+        """returns the slot ids a single transition rule step refers to"""
+        if rule['type'] == 'Shift':
+            return duties_by_shift[rule['id']]
+        if rule['type'] == 'Leave' and rule['id'] not in self.leaves_dependent_on_shift:
+            self.leaves_dependent_on_shift.append(rule['id'])
+        return [rule['id']]
+
+    def compile_transition_rules(self, duties_by_shift):
+        """flatten self.transition_rules into a table of (rule_index, day_offset, prev_slot, next_slot, strategy, cost).
+        each rule is parsed once per solve and duplicate rows are dropped so every clause is emitted once."""
+        table = []
+        seen = set()
+        for rule_index, rule_set in enumerate(self.transition_rules or []):
             sequence = rule_set['sequence']
-            for rule in [sequence[0], sequence[-1]]:
-                rule_id = rule['id']
-                if rule['type'] == 'Duty':
-                    slot_id = rule_id
-                    slots.append([slot_id])
-                    counter += rule['day']
-                elif rule['type'] == 'Leave':
-                    slot_id = rule_id
-                    slots.append([slot_id])
-                    counter += rule['day']
-                    if slot_id not in self.leaves_dependent_on_shift:
-                        self.leaves_dependent_on_shift.append(slot_id)
-                elif rule['type'] == 'Shift':
-                    slot_id = duties_by_shift[rule_id]
-                    slots.append(slot_id)
-                    counter += rule['day']
-            
-            for prev_shift, next_shift in product(slots[0], slots[-1]):
-                date = d + datetime.timedelta(days=counter)
-                transition = (w, d, prev_shift), (w, date, next_shift), rule_set['cost'], rule_set['strategy']
-                single_transition.append(transition)
-                                         
-                all_transition.append(single_transition) #possible bug here?
-            
-        return all_transition
-
-    def implement_sequence_constraints(self, prev_shift, next_shift, strategy, cost):
+            strategy = rule_set['strategy']
+            if strategy not in TRANSITION_STRATEGIES:
+                log.warning(f'transition rule {rule_index} has unknown strategy {strategy}')
+                continue
+            first, last = sequence[0], sequence[-1]
+            day_offset = first['day'] + last['day']
+            prev_slots = self.resolve_rule_slots(first, duties_by_shift)
+            next_slots = self.resolve_rule_slots(last, duties_by_shift)
+            for prev_slot, next_slot in product(prev_slots, next_slots):
+                row = (day_offset, prev_slot, next_slot, strategy, rule_set['cost'])
+                if row not in seen:
+                    seen.add(row)
+                    table.append((rule_index,) + row)
+        return table
+
+    def add_clause(self, terms, reason=()):
+        """BoolOr over literals and folded 0 / 1 values. dropped if a constant satisfies it, false constants are
+        left out and a clause with nothing left makes the model infeasible"""
+        literals = []
+        for term in terms:
+            if isinstance(term, int):
+                if term:
+                    return
+                continue
+            literals.append(term)
+        self.guard(self.model.AddBoolOr(literals), *reason)
+
+    def implement_sequence_constraints(self, prev_work, next_work, strategy, cost, w, d, rule_index=None):
+        """transition clause between the work terms (literal or folded value) of worker w on day d and on the day
+        the rule leads to"""
+        not_prev = 1 - prev_work if isinstance(prev_work, int) else prev_work.Not()
+        not_next = 1 - next_work if isinstance(next_work, int) else next_work.Not()
+        reason = ('transition', w, d, None, f'rule {rule_index} {strategy}')
 
         if strategy == 'never':
-            try:
-                transition = [
-                    self.work[prev_shift].Not(), self.work[next_shift].Not()
-                ]
-                self.model.AddBoolOr(transition)
-            except Exception as e:
-                pass
+            self.add_clause([not_prev, not_next], reason)
 
         elif strategy == 'min':
-            try:
-                transition = [
-                    self.work[prev_shift].Not(), self.work[next_shift].Not()
-                ]
-                w, d, s = prev_shift
-                trans_var = self.model.NewBoolVar(f'transition (w={w}, day={d})')
-                transition.append(trans_var)
-                self.model.AddBoolOr(transition)
-                self.obj_bool_vars_min.append(trans_var)
-                self.obj_bool_coeffs_min.append(cost)
-            except Exception as e:
-                pass
+            if any(isinstance(term, int) and term for term in (not_prev, not_next)) and cost >= 0:
+                # the transition cannot happen, its penalty would always be 0
+                return
+            trans_var = self.model.NewBoolVar(f'transition (w={w}, day={d})')
+            self.add_clause([not_prev, not_next, trans_var])
+            self.obj_bool_vars_min.append(trans_var)
+            self.obj_bool_coeffs_min.append(cost)
+            self.objective_family('transitions').add(trans_var, cost)
             
         elif strategy == 'max':
-            try:
-                transition = [
-                    self.work[prev_shift], self.work[next_shift]
-                ]
-                w, d, s = prev_shift
-
-                trans_var = self.model.NewBoolVar(f'transition (w={w}, day={d})')
-                transition.append(trans_var)
-                # self.model.AddBoolAnd(transition)
-                self.model.AddImplication(self.work[prev_shift], self.work[next_shift])
-                self.obj_bool_vars_min.append(trans_var)
-                self.obj_bool_coeffs_min.append(-cost)
-            except Exception as e:
-                print(e, 'has no transition')
+            trans_var = self.model.NewBoolVar(f'transition (w={w}, day={d})')
+            # self.model.AddBoolAnd(transition)
+            self.add_clause([not_prev, next_work], reason)
+            self.obj_bool_vars_min.append(trans_var)
+            self.obj_bool_coeffs_min.append(-cost)
+            self.objective_family('transitions').add(trans_var, -cost)
         
         elif strategy == 'always':
-            try:
-                self.model.AddImplication(self.work[prev_shift], self.work[next_shift])
-            except Exception as e:
-                print(e, 'has no transition')
+            self.add_clause([not_prev, next_work], reason)
 
 #         elif strategy == 'max':
 #             try:
@@ -880,37 +2067,62 @@ class JadualModel():
         print("starting transition rules")
         _date_list = self.date_list.copy()
         _date_list.extend(self.date_prior_list)
-        for w in self.workers_list:
-            for d in _date_list:
-                rules = self.iterate_rules_for_each_worker(w, d, duties_by_shift)
-                for rule in rules:
-                    for combinations in rule:
-                        prev_shift, next_shift, cost, strategy = combinations
-                        self.implement_sequence_constraints(prev_shift, next_shift, strategy, cost)
+        table = self.compile_transition_rules(duties_by_shift)
+        self.transition_clause_counts = {rule_index: 0 for rule_index in range(len(self.transition_rules or []))}
+        grid = self.work
+        present = grid.present()
+        for rule_index, day_offset, prev_slot, next_slot, strategy, cost in table:
+            if prev_slot not in grid.slot_index or next_slot not in grid.slot_index:
+                continue
+            psi, nsi = grid.slot_index[prev_slot], grid.slot_index[next_slot]
+            offset = datetime.timedelta(days=day_offset)
+            day_pairs = [
+                (grid.date_index[d], grid.date_index[d + offset])
+                for d in _date_list
+                if d in grid.date_index and d + offset in grid.date_index
+            ]
+            for wi in range(len(grid.workers)):
+                for di, dj in day_pairs:
+                    if present[wi, di, psi] and present[wi, dj, nsi]:
+                        self.implement_sequence_constraints(
+                            grid.term(wi, di, psi), grid.term(wi, dj, nsi), strategy, cost,
+                            grid.workers[wi], grid.dates[di], rule_index
+                        )
+                        self.transition_clause_counts[rule_index] += 1
+        log.info(f'transition clauses per rule: {self.transition_clause_counts}')
                         
 # ------------------------------------------------------------------------------------------------------------
 # maximize excess for covers
 # ------------------------------------------------------------------------------------------------------------
 
     def excess_covers(self):
+        if self.explain:
+            # an objective family only, its min_staff bound would repeat the guarded cover constraint unguarded
+            return
         num_workers = len(self.workers_list)
+        duty_index = self.get_duty_index()
+        grid = self.work
         for d in self.date_list:
-            for s in self.duty_id_for_dates[d]:
-                min_, max_ = utils.get_min_max_staffs(self.df, d, s)
-                min_staff, max_staff = int(min_), int(max_)
-                works = [self.work[(w, d, s)] for w in self.workers_list]
+            di = grid.date_index[d]
+            for s in self.covered_duties(d):
+                min_staff, max_staff = duty_index.min_max_staff(d, s)
+                works, constant = grid.cover_terms(di, grid.slot_index[s])
                 # Ignore Off shift.
                 # min_demand = weekly_cover_demands[d][s - 1]
                 worked = self.model.NewIntVar(min_staff, num_workers, '')
-                self.model.Add(worked == sum(works))
+                terms = LinearTerms(works, constant=constant)
+                terms.add(worked, -1)
+                terms.add_bounded(self.model, 0, 0)
                 # over_penalty = excess_cover_penalties[s - 1]
                 over_penalty = 5
                 if over_penalty > 0:
                     name = f'excess_demand(shift={s}, day={d})'
                     excess = self.model.NewIntVar(0, num_workers - min_staff, name)
-                    self.model.Add(excess == worked - min_staff)
+                    excess_ct = self.model.Add(worked - excess == min_staff)
+                    self.excess_cover_constraints[(d, s)] = (worked, excess, excess_ct)
                     self.obj_bool_vars_min.append(excess)
                     self.obj_bool_coeffs_min.append(over_penalty)
+                    self.objective_family('excess_covers').add(excess, over_penalty)
                     
 # ------------------------------------------------------------------------------------------------------------
 #  MAKE IT FLEXIBLE
@@ -921,18 +2133,28 @@ class JadualModel():
             dummy_id = f"dummy_{i + 1}"
             self.workers_roles[dummy_id] = role_list
             self.workers_list.append(dummy_id)
+            self.work.extend(workers=[dummy_id])
         
 # ------------------------------------------------------------------------------------------------------------
 #  Objectives
 # ------------------------------------------------------------------------------------------------------------
 
+    def objective_terms(self):
+        """every request, transition and penalty term of the objective, coefficients of repeated variables merged"""
+        terms = LinearTerms(self.obj_bool_vars_min, self.obj_bool_coeffs_min)
+        terms.extend(self.obj_int_vars, self.obj_int_coeffs)
+        return terms
+
+    def objective_family(self, name):
+        if name not in self.objective_families:
+            self.objective_families[name] = LinearTerms()
+        return self.objective_families[name]
+
     def minimize(self):
-        self.model.Minimize(
-            sum(self.obj_bool_vars_min[i] * self.obj_bool_coeffs_min[i]
-                for i in range(len(self.obj_bool_vars_min))) + 
-            sum(self.obj_int_vars[i] * self.obj_int_coeffs[i]
-                for i in range(len(self.obj_int_vars)))
-        )
+        if self.explain:
+            # the solver only reports a conflicting set of assumptions for a model without objective
+            return
+        self.model.Minimize(self.objective_terms().expression())
 
 # ------------------------------------------------------------------------------------------------------------
 #  Worker per shift
@@ -941,94 +2163,528 @@ class JadualModel():
     def number_workers_per_shift(self):
     #     """constraint no of worker per shift is between mix & max_staff"""
         print("constraint no of worker per shift is between mix & max_staff")
+        duty_index = self.get_duty_index()
+        grid = self.work
         for d in self.date_list:
-            for s in self.duty_id_for_dates[d]:
-                min_, max_ = utils.get_min_max_staffs(self.df, d, s)
-                min_staff, max_staff = int(min_), int(max_)
-                self.model.Add(sum(self.work[(w, d, s)] for w in self.workers_list) >= min_staff)
-                self.model.Add(sum(self.work[(w, d, s)] for w in self.workers_list) <= max_staff)
+            di = grid.date_index[d]
+            for s in self.covered_duties(d):
+                min_staff, max_staff = duty_index.min_max_staff(d, s)
+                works, constant = grid.cover_terms(di, grid.slot_index[s])
+                cover_ct = self.guard(
+                    LinearTerms(works, constant=constant).add_bounded(self.model, min_staff, max_staff),
+                    'cover', date=d, slot=s, detail=f'{min_staff}-{max_staff} staff'
+                )
+                # min and max staff are the two ends of one constraint
+                self.cover_constraints[(d, s)] = (cover_ct, cover_ct)
 
     def maximize_workers_per_shift(self):
         """objective function to maximize no of worker per shift is between mix & max_staff"""
         print("objective function to maximize no of worker per shift is between mix & max_staff")
         # constraint to maximize no worker per shift.
+        # minimize() replaces any objective set here, the family is used as a stage of solve_lexicographic
+        grid = self.work
+        family = self.objective_family('coverage')
         for d in self.date_list:
-            for s in self.duty_id_for_dates[d]:
-                self.model.Maximize(
-                    sum(self.work[(w, d, s)] for w in self.workers_list)
-                )
+            di = grid.date_index[d]
+            for s in self.covered_duties(d):
+                works, constant = grid.cover_terms(di, grid.slot_index[s])
+                family.extend(works, [-1] * len(works))
+                family.add(constant, -1)
+
+# ------------------------------------------------------------------------------------------------------------
+#  Warm start
+# ------------------------------------------------------------------------------------------------------------
+
+    def horizon_key(self):
+        """key under which the last solution of this tenant and horizon is remembered"""
+        return (self.tenant_id, to_date(self.date_list[0]), to_date(self.date_list[-1]))
+
+    def remember_solution(self, result):
+        if result.has_solution:
+            remember_last_solution(self.horizon_key(), result)
+
+    def hint_values_from_roster(self, roster):
+        """hint value of every work literal from a published roster in lambda_payload format"""
+        assigned = roster_slot_keys(roster)
+        workers, dates, slots, cells, _, _ = self.work_layout()
+        days = [to_date(d) for d in dates]
+        return [1 if (workers[wi], days[di], slots[si]) in assigned else 0 for wi, di, si in cells]
+
+    def hint_values_from_result(self, result):
+        """hint value of every work literal from a previous SolveResult, 0 where it has no value"""
+        workers, dates, slots, cells, _, _ = self.work_layout()
+        if result.workers == workers and result.dates == dates and result.slots == slots:
+            # same layout, gather straight from the dense assignment
+            values = result.assignment[cells[:, 0], cells[:, 1], cells[:, 2]]
+            return np.maximum(values, 0).tolist()
+        assigned = set()
+        for wi, di, si in zip(*np.nonzero(result.assignment == 1)):
+            assigned.add((result.workers[wi], to_date(result.dates[di]), result.slots[si]))
+        days = [to_date(d) for d in dates]
+        return [1 if (workers[wi], days[di], slots[si]) in assigned else 0 for wi, di, si in cells]
+
+    def add_solution_hints(self, hint_roster=None, hint_last_solution=False):
+        """seed every work literal with AddHint values, taken from hint_roster if given or else from the
+        last solution stored for the same tenant and horizon. returns the hint source or None"""
+        previous = last_solution(self.horizon_key()) if hint_last_solution and not hint_roster else None
+        if hint_roster:
+            values, source = self.hint_values_from_roster(hint_roster), "roster"
+        elif previous is not None:
+            values, source = self.hint_values_from_result(previous), "last_solution"
+        else:
+            return None
+        self.set_solution_hints(values, source)
+        return source
+
+    def set_solution_hints(self, values, source):
+        """replace the model hints with one value per work literal, in work_layout order"""
+        _, _, _, _, var_indices, _ = self.work_layout()
+        self.model.ClearHints()
+        hint = self.model.Proto().solution_hint
+        hint.vars.extend(int(i) for i in var_indices)
+        hint.values.extend(values)
+        self.hint_source = source
+        log.info(f'added {len(values)} solution hints from {source}')
+
+# ------------------------------------------------------------------------------------------------------------
+#  Input digest and roster cache
+# ------------------------------------------------------------------------------------------------------------
+
+    def input_digest(self, **solve_options):
+        """sha256 of every constructor input plus the solve options, the key of the roster cache.
+        prior timeslots are loaded first so a change in the previous roster changes the digest"""
+        if self.uses_prior_roster():
+            self.load_prior_timeslots()
+        inputs = {
+            'workers_list': self.workers_list,
+            'workers_roles': self.workers_roles,
+            'requests_data': self.requests,
+            'date_list': self.date_list,
+            'duty_id_for_dates': self.duty_id_for_dates,
+            'duty_types': self.duty_types,
+            'leave_types': self.leave_types,
+            'leaves_id_for_dates': self.leaves_id_for_dates,
+            'df': self.df,
+            'transition_rules': self.transition_rules,
+            'off_day': self.off_day,
+            'off_day_date_list': self.off_day_date_list,
+            'tenant_id': self.tenant_id,
+            'sum_constraints': self.sum_constraints,
+            'sequence_constraints': self.sequence_constraints,
+            'prior_timeslots': self.prior_timeslots,
+            'carried_totals': self.carried_totals,
+            'closes_horizon': self.closes_horizon,
+            'external_duties': sorted(self.external_duties, key=str),
+        }
+        if self.df is None and self.duty_index is not None:
+            # models built from metadata only, e.g. the synthetic benchmark tenants
+            index = self.duty_index
+            inputs['duty_index'] = [index.roles, index.staff, index.slot_types, index.shift_duties]
+        version = {'cache': CACHE_VERSION, 'ortools': ortools.__version__}
+        payload = json.dumps(
+            canonical({'version': version, 'inputs': inputs, 'options': solve_options}), sort_keys=True, separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def cache_entry(self):
+        request_list = [[w, d.isoformat(), s] for w, d, s in self.request_list]
+        return {'result': self.result.to_record(), 'request_list': request_list}
+
+    def restore_from_cache(self, cache, digest):
+        """load the cached result for digest into self.result without building or solving. returns True on a hit"""
+        entry = cache.get(digest)
+        if entry is None:
+            return False
+        known_dates = {d.isoformat(): d for d in list(self.date_list) + self.prior_date_range()}
+        dates = [known_dates.get(d, to_date(d)) for d in entry['result']['dates']]
+        self.result = SolveResult.from_record(entry['result'], dates)
+        self.request_list = [(w, known_dates.get(d, to_date(d)), s) for w, d, s in entry['request_list']]
+        for _, d, _ in self.request_list:
+            # populate_requests orders the payload days, requested days first
+            self.schedule_data.setdefault(d, {})
+        self.remember_solution(self.result)
+        log.info(f'roster cache hit {digest}')
+        return True
+
+    def store_in_cache(self, cache, digest):
+        if self.result is None or self.result.status_code not in CACHEABLE_STATUSES:
+            return
+        if self.stop_requested:
+            # a stopped search is not the result these inputs solve to
+            return
+        cache.put(digest, self.model, self.cache_entry())
 
 # ------------------------------------------------------------------------------------------------------------
 #  Solve
 # ------------------------------------------------------------------------------------------------------------                
 
+    def apply_solver_profile(self, profile=DEFAULT_SOLVER_PROFILE, parameters=None):
+        """configure self.solver from a SOLVER_PROFILES entry, with optional per call parameter overrides"""
+        if profile is not None and profile not in SOLVER_PROFILES:
+            raise ValueError(f'unknown solver profile {profile}, expected one of {list(SOLVER_PROFILES)}')
+        solver_parameters = dict(SOLVER_PROFILES[profile]) if profile is not None else {}
+        solver_parameters.update(parameters or {})
+        self.solver = cp_model.CpSolver()
+        for name, value in solver_parameters.items():
+            setattr(self.solver.parameters, name, value)
+        self.solver_profile = profile
+        self.solver_parameters = solver_parameters
+
+    def work_layout(self):
+        """axes of the dense assignment array and, for every work literal, its (worker, date, slot) cell and
+        model variable index. built once and reused until new literals are added to the model"""
+        grid = self.work
+        size = (len(grid), grid.mask.shape)
+        if self._work_layout is not None and self._work_layout[-1] == size:
+            return self._work_layout
+        cells = np.argwhere(grid.mask)
+        var_indices = np.fromiter((var.Index() for var in grid.literals[grid.mask]), dtype=np.int64, count=len(cells))
+        self._work_layout = (list(grid.workers), list(grid.dates), list(grid.slots), cells, var_indices, size)
+        return self._work_layout
+
+    def extract_assignment(self, solution):
+        """scatter a full solution vector (indexed by model variable) into the dense assignment array, folded cells
+        keep their value"""
+        _, _, _, _, var_indices, _ = self.work_layout()
+        return self.assignment_from_values(np.asarray(solution, dtype=np.int64)[var_indices])
+
+    def assignment_from_values(self, values):
+        """dense assignment array from one value per work literal, in work_layout order"""
+        _, _, _, cells, _, _ = self.work_layout()
+        assignment = self.work.fixed.copy()
+        assignment[cells[:, 0], cells[:, 1], cells[:, 2]] = values
+        return assignment
+
+    def use_solution_pool(self, size, min_distance=0):
+        """keep the size best distinct rosters of every following solve in self.solution_pool, at least
+        min_distance work literals apart. size is an upper bound, see fill_solution_pool"""
+        self.solution_pool_options = (size, min_distance) if size else None
+
+    def use_solution_stream(self, listener):
+        """publish every improving solution of the following solves as a SolutionEvent to listener(event), which
+        may return True to stop the search early. None turns streaming off"""
+        self.solution_listener = listener
+
+    def stop_search(self):
+        """stop the running solve early, it returns with the best solution found so far. called before the
+        solve starts, e.g. while the model is still being built, the solve returns at once without a search"""
+        self.stop_requested = True
+        if self.search_callback is not None:
+            self.search_callback.stop()
+
+    def alternative_payloads(self, include_leaves=True, include_requests=True):
+        """every roster of the solution pool, best first, as its objective, the number of work literals it changes
+        against the best roster and its lambda_payload"""
+        pool = self.solution_pool
+        if pool is None or not pool.rosters:
+            return []
+        size = len(pool.var_indices)
+        result, schedule_data = self.result, self.schedule_data
+        # populate_requests put the requested days first, keep that order in every payload
+        days = list(schedule_data)
+        alternatives = []
+        try:
+            for roster in pool.rosters:
+                self.result = replace(result, objective=roster.objective, assignment=self.assignment_from_values(roster.values(size)))
+                self.schedule_data = {d: {} for d in days}
+                self.populate_solved_data(include_leaves)
+                alternatives.append({
+                    'objective': roster.objective,
+                    'distance': pool.distance(pool.rosters[0].packed, roster.packed),
+                    'payload': self.lambda_payload(include_leaves, include_requests),
+                })
+        finally:
+            self.result, self.schedule_data = result, schedule_data
+        return alternatives
+
     def solve(self):
-        """solve model, returns a solution status which can be used to print solution status"""
-        return self.solver.Solve(self.model)
+        """solve model once and store the outcome as a SolveResult in self.result"""
+        workers, dates, slots, cells, var_indices, _ = self.work_layout()
+        if self.solution_listener is not None:
+            timer = SolutionStream(
+                var_indices, (workers, dates, slots, cells), self.solution_listener, *(self.solution_pool_options or ()),
+                on_stop=self.stop_search
+            )
+            self.solution_pool = timer
+        elif self.solution_pool_options is not None:
+            timer = self.solution_pool = SolutionPool(var_indices, *self.solution_pool_options)
+        else:
+            timer = SolutionTimer()
+        self.search_callback = timer
+        if self.stop_requested:
+            # stopped before the search started
+            timer.stop_requested = True
+            self.solver.parameters.max_time_in_seconds = 0.0
+        try:
+            solution_status = self.solver.Solve(self.model, timer)
+        finally:
+            self.search_callback = None
+        status = status_from_code(solution_status)
+        result = SolveResult(
+            status=status,
+            status_code=solution_status,
+            wall_time=self.solver.WallTime(),
+            conflicts=self.solver.NumConflicts(),
+            branches=self.solver.NumBranches(),
+            solver_profile=self.solver_profile,
+            solver_parameters=dict(self.solver_parameters),
+            first_solution_time=timer.first_solution_time,
+            num_solutions=timer.num_solutions,
+            hint_source=self.hint_source,
+            build_profile=self.profiler.report(),
+            workers=workers,
+            dates=dates,
+            slots=slots,
+        )
+        if result.has_solution:
+            result.objective = self.solver.ObjectiveValue()
+            result.best_bound = self.solver.BestObjectiveBound()
+            result.assignment = self.extract_assignment(self.solver.ResponseProto().solution)
+        self.result = result
+        self.remember_solution(result)
+        return result
+
+    def hint_solution(self, solution, source):
+        """hint every model variable with a full solution vector of this model"""
+        self.model.ClearHints()
+        hint = self.model.Proto().solution_hint
+        hint.vars.extend(range(len(solution)))
+        hint.values.extend(int(v) for v in solution)
+        self.hint_source = source
+
+    def solve_lexicographic(self, stages, stage_time_limit=None):
+        """Minimize the objective families of stages one after another, most important first.
+
+        Each stage is searched for at most stage_time_limit seconds, by default an even
+        share of the profile's max_time_in_seconds and max_deterministic_time, whichever
+        it sets. Its best value is then kept as an
+        upper bound while the next stages run, and its solution hints the next search.
+        A stage that finds no solution ends the solve with the last solved stage's
+        result. The returned result is that of the last solved stage, with every stage
+        summarised in result.stages.
+        """
+        unknown = [name for name in stages if name not in OBJECTIVE_FAMILIES]
+        if unknown:
+            raise ValueError(f'unknown objective families {unknown}, expected some of {OBJECTIVE_FAMILIES}')
+        if stage_time_limit is not None:
+            stage_limits = {'max_time_in_seconds': stage_time_limit}
+        else:
+            stage_limits = {
+                name: self.solver_parameters[name] / len(stages)
+                for name in STAGE_BUDGET_PARAMETERS if self.solver_parameters.get(name)
+            }
+        summaries = []
+        solved = None
+        for name in stages:
+            terms = self.objective_terms() if name == 'default' else self.objective_families.get(name)
+            if terms is None or not terms.variables:
+                log.info(f'objective stage {name} has no terms, skipped')
+                continue
+            expression = terms.expression()
+            self.model.Minimize(expression)
+            for parameter, limit in stage_limits.items():
+                setattr(self.solver.parameters, parameter, limit)
+            result = self.solve()
+            summaries.append({
+                'name': name,
+                'status': result.status,
+                'objective': result.objective,
+                'best_bound': result.best_bound,
+                'wall_time': result.wall_time,
+                'time_limit': stage_limits.get('max_time_in_seconds'),
+                'deterministic_time_limit': stage_limits.get('max_deterministic_time'),
+            })
+            log.info(f'objective stage {name}: {result.status} {result.objective}')
+            if not result.has_solution:
+                break
+            solved = result
+            if self.stop_requested:
+                log.info(f'search stopped in objective stage {name}, later stages skipped')
+                break
+            self.model.Add(expression <= int(round(result.objective)))
+            self.hint_solution(self.solver.ResponseProto().solution, f'stage_{name}')
+
+        for parameter in stage_limits:
+            if parameter in self.solver_parameters:
+                setattr(self.solver.parameters, parameter, self.solver_parameters[parameter])
+            else:
+                self.solver.parameters.ClearField(parameter)
+        result = solved or self.result
+        if result is None:
+            # no stage had any terms
+            result = self.solve()
+        result.stages = summaries
+        result.wall_time = sum(stage['wall_time'] for stage in summaries) or result.wall_time
+        self.result = result
+        self.remember_solution(result)
+        return result
+
+    def fill_solution_pool(self):
+        """Top up a solution pool the search left short.
+
+        CP-SAT only reports improving solutions, so a model solved at once, e.g. by
+        presolve, leaves a single roster in the pool. Each follow-up solve adds a
+        no-good cut that keeps the next roster at least min_distance work literals from
+        every kept one and offers its solution to the pool, until the pool is full or no
+        such roster is found. A follow-up solve gets the main solve's wall time, at least
+        a second. The cuts only hold under one assumption literal, which is switched off
+        afterwards, so self.result and the model's solutions are unchanged.
+        """
+        pool = self.solution_pool
+        if pool is None or not pool.size or self.result is None or not self.result.has_solution:
+            return
+        if len(pool.rosters) >= pool.size:
+            return
+        _, _, _, _, var_indices, _ = self.work_layout()
+        grid = self.work
+        literals = list(grid.literals[grid.mask])
+        filling = self.model.NewBoolVar('solution_pool_fill')
+        time_limit = self.solver.parameters.max_time_in_seconds
+        self.solver.parameters.max_time_in_seconds = max(1.0, self.result.wall_time)
+        self.model.ClearAssumptions()
+        self.model.AddAssumptions([filling])
+        cut = set()
+        try:
+            while len(pool.rosters) < pool.size and not self.stop_requested:
+                for roster in pool.rosters:
+                    if roster.packed in cut:
+                        continue
+                    cut.add(roster.packed)
+                    # number of literals that differ from the kept roster
+                    values = roster.values(len(literals))
+                    distance = LinearTerms()
+                    for literal, value in zip(literals, values):
+                        distance.add(literal, -1 if value else 1)
+                    distance.constant += int(values.sum())
+                    distance.add_bounded(self.model, max(pool.min_distance, 1), len(literals)).OnlyEnforceIf(filling)
+                timer = SolutionTimer()
+                self.search_callback = timer
+                try:
+                    status = self.solver.Solve(self.model, timer)
+                finally:
+                    self.search_callback = None
+                if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                    break
+                values = np.asarray(self.solver.ResponseProto().solution)[var_indices].astype(np.uint8)
+                pool.keep(PooledRoster(self.solver.ObjectiveValue(), np.packbits(values).tobytes(), self.solver.WallTime()))
+        finally:
+            self.model.ClearAssumptions()
+            self.model.AddBoolOr([filling.Not()])
+            self.solver.parameters.max_time_in_seconds = time_limit
+        log.info(f'solution pool holds {len(pool.rosters)} of {pool.size} rosters')
+
+    def solve_staged(self, objective_stages=None, stage_time_limit=None):
+        """solve_lexicographic over objective_stages if given, else a single solve of the full objective"""
+        if objective_stages:
+            result = self.solve_lexicographic(objective_stages, stage_time_limit)
+        else:
+            result = self.solve()
+        self.fill_solution_pool()
+        return result
+
+    def get_result(self):
+        """returns the stored SolveResult, solving the model only if it has not been solved yet"""
+        if self.result is None:
+            self.solve()
+        return self.result
 
     def check_feasibility(self):
-        """returns solution status accepts a solution status which is a solver object"""
-        solution_status = self.solve()
-        if solution_status == cp_model.INFEASIBLE:
-            status = "INFEASIBLE"
-            # raise Exception(status)
-        elif solution_status not in [cp_model.FEASIBLE, cp_model.OPTIMAL]:
-            status = "INFEASIBLE"
-            # raise Exception(status)
-        elif solution_status == cp_model.OPTIMAL:
-            status = "OPTIMAL"
-        else:
-            status = "FEASIBLE"
-        
-        return status
+        """returns solution status of the stored solve result"""
+        return self.get_result().status
+
+    def explain_infeasibility(
+        self,
+        constraints,
+        duties_by_shift,
+        min_off_day = 0,
+        max_off_day = 1,
+        selected_roster = [],
+        solver_profile = DEFAULT_SOLVER_PROFILE,
+        solver_parameters = None
+    ):
+        """Explain why the default model has no solution, instead of re-solving with one rule family off at a time.
+
+        The model is built as in default_model, but each hard rule group (see
+        INFEASIBILITY_RULES) only holds under the assumption literal of its
+        InfeasibilityReason, e.g. the cover of one duty on one date or one request, and
+        every assumption is set. If the model is infeasible the solver's
+        SufficientAssumptionsForInfeasibility is a conflicting subset of them. It is
+        solved again under that subset alone until it stops shrinking, usually a couple
+        of short solves. Call it on a fresh JadualModel, the result is also kept in
+        self.explanation.
+        """
+        print('explaining infeasibility')
+        self.explain = True
+        parameters = dict(EXPLAIN_SOLVER_PARAMETERS)
+        parameters.update(solver_parameters or {})
+        self.apply_solver_profile(solver_profile, parameters)
+        self.build_default_model(constraints, duties_by_shift, min_off_day, max_off_day, selected_roster)
+
+        reasons = {literal.Index(): reason for reason, literal in self.assumptions.items()}
+        explanation = InfeasibilityExplanation(status=None, num_assumptions=len(reasons))
+        assumed = list(reasons)
+        core = None
+        while True:
+            self.model.ClearAssumptions()
+            self.model.AddAssumptions([self.assumptions[reasons[index]] for index in assumed])
+            result = self.solve()
+            explanation.solves += 1
+            explanation.wall_time += result.wall_time
+            if explanation.status is None:
+                # status_from_code reports a solve that ran out of time as INFEASIBLE
+                if result.status_code == cp_model.INFEASIBLE or result.has_solution:
+                    explanation.status = result.status
+                else:
+                    explanation.status = "UNKNOWN"
+            if result.status_code != cp_model.INFEASIBLE:
+                # a smaller subset that could not be proven infeasible again keeps the last core
+                break
+            core = list(self.solver.SufficientAssumptionsForInfeasibility())
+            if not core or len(core) >= len(assumed):
+                break
+            assumed = core
+        if core is not None:
+            explanation.reasons = [reasons[index] for index in core]
+        log.info(
+            f'{explanation.status} with {explanation.num_assumptions} assumptions, '
+            f'{len(explanation.reasons)} in conflict after {explanation.solves} solves'
+        )
+        self.explanation = explanation
+        return explanation
         
 # ------------------------------------------------------------------------------------------------------------
 #  Populate solution
 # ------------------------------------------------------------------------------------------------------------   
 
     def populate_solved_data(self, include_leaves=True):
-        """populate sovled model object, where solution status which is a solver object. will include leaves by default"""
+        """populate sovled model object from the stored solve result. will include leaves by default"""
         
-        solution_status = self.solve()
+        result = self.get_result()
         print('\nStatistics')
-        print('  - conflicts: %i' % self.solver.NumConflicts())
-        print('  - objective value: %i' % self.solver.ObjectiveValue())
-        print('  - branches : %i' % self.solver.NumBranches())
-        print('  - wall time: %f s' % self.solver.WallTime())
-        if solution_status == cp_model.OPTIMAL or solution_status == cp_model.FEASIBLE:
+        print('  - conflicts: %i' % result.conflicts)
+        print('  - objective value: %i' % (result.objective or 0))
+        print('  - branches : %i' % result.branches)
+        print('  - wall time: %f s' % result.wall_time)
+        if result.has_solution:
+            print('  - assignments: %i' % int((result.assignment == 1).sum()))
             print("solution optimal!")
             for d in self.date_list:
-                worker_assigned = []
                 self.schedule_data.setdefault(d, {})
-                
                 if include_leaves:
                     for l in self.leaves_id_for_dates[d]:
-                        worker_in_leaves_data = []
-                        for w in self.workers_list:
-                            if self.solver.Value(self.work[(w, d, l)]) == 1:
-                                worker_in_leaves_data.append(w)
-                                worker_assigned.append(w)
-                            self.schedule_data[d][l] = worker_in_leaves_data
-                        
+                        self.schedule_data[d][l] = result.assigned_workers(d, l)
                 for s in self.duty_id_for_dates[d]:
-                    worker_in_shift_data = []
-                    for w in self.workers_list:
-                        if self.solver.Value(self.work[(w, d, s)]) == 1:
-                            worker_in_shift_data.append(w)
-                            worker_assigned.append(w)
                     self.schedule_data[d].setdefault(s, [])
-                    self.schedule_data[d][s].extend(worker_in_shift_data)
-                
-                # worker_not_assigned = [worker for worker in self.workers_list if worker not in worker_assigned]
-                # self.schedule_data[d]['UNASSIGNED'] = worker_not_assigned
-        elif solution_status == cp_model.INFEASIBLE:
+                    self.schedule_data[d][s].extend(result.assigned_workers(d, s))
+        else:
             print("solution infeasible")
 
     def print_solver_value(self):
+        result = self.get_result()
         for w in self.workers_list:
             for d in self.date_list:
                 for s in self.duty_id_for_dates[d]:
-                    print(f'{w},{d},{s}', self.solver.Value(self.work[(w, d, s)]))
+                    print(f'{w},{d},{s}', result.value(w, d, s))
 
 # ------------------------------------------------------------------------------------------------------------
 #  Transform solution
@@ -1043,7 +2699,32 @@ class JadualModel():
         except Exception as e:
             return default_id
     
+    def request_tables(self):
+        """index requests once for the payload: the set of requested (worker, date, slot)
+        and the first request id per (date, workerId), as check_requested and get_request_id resolve them"""
+        requested = set(self.request_list)
+        request_ids = {}
+        for request in self.requests:
+            request_ids.setdefault((request["date"], request["workerId"]), request["id"])
+        return requested, request_ids
+
+    def annotate_requests(self, roster):
+        """vectorised check_requested and get_request_id over an exploded roster with datetime start/end columns"""
+        requested, request_ids = self.request_tables()
+        slot_keys = pd.MultiIndex.from_arrays([roster['worker_id'], roster['start'].dt.date, roster['id']])
+        roster['requested'] = slot_keys.isin(list(requested)) if requested else False
+
+        roster['start'] = roster['start'].dt.strftime('%Y-%m-%d')
+        roster['end'] = roster['end'].dt.strftime('%Y-%m-%d')
+        if request_ids:
+            date_worker_keys = pd.MultiIndex.from_arrays([roster['start'], roster['worker_id']])
+            matched_ids = pd.Series(request_ids).reindex(date_worker_keys).to_numpy()
+            roster['id'] = np.where(pd.isna(matched_ids), roster['id'].to_numpy(), matched_ids)
+        return roster
+
     def lambda_payload(self, include_leaves=True, include_requests=True):
+        if self.result is None:
+            self.populate_solved_data(include_leaves)
         roster_list = []
         df = self.df
         for day in self.schedule_data:
@@ -1053,17 +2734,11 @@ class JadualModel():
 
         roster = pd.concat(roster_list)
         roster = roster.explode('worker_id')
-        # for worker, day, slot in self.request_list:
-        #     roster_requested = roster[(roster['worker_id'] == worker) & (roster['start'] == day) & (roster['id'] == slot)]
 
         roster['start'] = pd.to_datetime(roster['start'])
         roster['end'] = pd.to_datetime(roster['end'])
-        
-        roster['requested'] = roster.apply(lambda x: self.check_requested(x['worker_id'], x['start'], x['id']), axis=1)
-        
-        roster['start'] = roster['start'].apply(lambda x: x.strftime('%Y-%m-%d'))
-        roster['end'] = roster['end'].apply(lambda x: x.strftime('%Y-%m-%d'))
-        roster["id"] = roster.apply(lambda x: self.get_request_id(x["id"], x["start"], x["worker_id"]), axis=1)
+        roster = self.annotate_requests(roster)
+
         _selected_columns = [
             'id', 
             'start', 
@@ -1090,50 +2765,92 @@ class JadualModel():
         final_roster = _roster.reset_index(drop=True)[selected_columns]
         return final_roster.to_json(orient='records')
     
-    def default_model(
+    def build_default_model(
         self,
         constraints, 
         duties_by_shift, 
         min_off_day = 0, 
         max_off_day = 1, 
-        selected_roster = [],
-        selected_duties_paylod = True,
-        selected_leaves_payload = True
+        selected_roster = []
     ):
-        print('using default model')
-        self.create_model_duties()
-        self.create_model_leaves()
-        self.number_off_day_per_worker_per_roster(params=[min_off_day, max_off_day])
-        self.one_worker_one_shift()
+        """builds the variables, constraints and objective of the default model without solving it"""
+        self.run_phase('resolve_fixed_assignments', self.resolve_fixed_assignments, selected_roster)
+        self.run_phase('create_model_duties', self.create_model_duties)
+        self.run_phase('create_model_leaves', self.create_model_leaves)
+        self.run_phase('number_off_day_per_worker_per_roster', self.number_off_day_per_worker_per_roster, params=[min_off_day, max_off_day])
+        self.run_phase('one_worker_one_shift', self.one_worker_one_shift)
 
-        self.build_previous_roster()
-        self.use_current_selected_roster(selected_roster)
+        self.run_phase('build_previous_roster', self.build_previous_roster)
 
-        self.number_workers_per_shift()
+        self.run_phase('number_workers_per_shift', self.number_workers_per_shift)
         
-        self.match_worker_role_and_shift_hard()
+        self.run_phase('match_worker_role_and_shift_hard', self.match_worker_role_and_shift_hard)
         
-        self.implement_slot_sequence_constraints(duties_by_shift)
-        self.implement_sum_constraint()
-        self.generate_transition_rules_model(duties_by_shift)
+        self.run_phase('implement_slot_sequence_constraints', self.implement_slot_sequence_constraints, duties_by_shift)
+        self.run_phase('implement_sum_constraint', self.implement_sum_constraint)
+        self.run_phase('generate_transition_rules_model', self.generate_transition_rules_model, duties_by_shift)
 
         #initialize dictionary of function from jadual lib
         constraints_func = self.get_functions_dict()
 
         #iterate based on functions
         for constraint in constraints:
-            constraints_func[constraint["functionName"]]()
-        self.populate_requests()
-        self.excess_covers()
-        self.minimize()
-        self.use_current_selected_roster(selected_roster)
-        self.solve()
-        self.check_feasibility()
+            self.run_phase(constraint["functionName"], constraints_func[constraint["functionName"]])
+        self.run_phase('populate_requests', self.populate_requests)
+        self.run_phase('excess_covers', self.excess_covers)
+        self.run_phase('minimize', self.minimize)
+
+    def default_model(
+        self,
+        constraints, 
+        duties_by_shift, 
+        min_off_day = 0, 
+        max_off_day = 1, 
+        selected_roster = [],
+        selected_duties_paylod = True,
+        selected_leaves_payload = True,
+        solver_profile = DEFAULT_SOLVER_PROFILE,
+        solver_parameters = None,
+        hint_roster = None,
+        hint_last_solution = False,
+        cache = None,
+        objective_stages = None,
+        stage_time_limit = None,
+        solution_pool_size = None,
+        min_hamming_distance = 0,
+        on_solution = None
+    ):
+        print('using default model')
+        if cache is not None:
+            digest = self.input_digest(
+                model='default',
+                constraints=constraints,
+                duties_by_shift=duties_by_shift,
+                min_off_day=min_off_day,
+                max_off_day=max_off_day,
+                selected_roster=selected_roster,
+                solver_profile=solver_profile,
+                solver_parameters=solver_parameters,
+                objective_stages=objective_stages,
+                stage_time_limit=stage_time_limit,
+            )
+            # the pool is not cached, a pooled solve always searches
+            if not solution_pool_size and self.restore_from_cache(cache, digest):
+                self.populate_solved_data()
+                return self.lambda_payload()
+        self.apply_solver_profile(solver_profile, solver_parameters)
+        self.build_default_model(constraints, duties_by_shift, min_off_day, max_off_day, selected_roster)
+        self.add_solution_hints(hint_roster, hint_last_solution)
+        self.use_solution_pool(solution_pool_size, min_hamming_distance)
+        self.use_solution_stream(on_solution)
+        self.solve_staged(objective_stages, stage_time_limit)
+        if cache is not None:
+            self.store_in_cache(cache, digest)
         self.populate_solved_data()
 
         return self.lambda_payload()
     
-    def use_selected_roster_model(
+    def build_selected_roster_model(
         self, 
         constraints, 
         duties_by_shift, 
@@ -1141,46 +2858,99 @@ class JadualModel():
         max_off_day,
         include_requests,
         selected_roster = [], 
-        include_leaves = False, 
-        include_duties= False,
-        include_off_days = False, 
-        
+        include_leaves = False
     ):
-        """this model takes a dynamic parameter of leaves and off days"""
-        print('using selected model')
-        self.create_model_duties()
+        """builds the selected roster model without solving it"""
+        self.run_phase('resolve_fixed_assignments', self.resolve_fixed_assignments, selected_roster, include_requests)
+        self.run_phase('create_model_duties', self.create_model_duties)
         if include_leaves:
-            self.create_model_leaves()
+            self.run_phase('create_model_leaves', self.create_model_leaves)
         
         
-        self.one_worker_one_shift()
-        self.number_off_day_per_worker_per_roster(params=[min_off_day, max_off_day])
-        self.build_previous_roster()
-        self.use_current_selected_roster(selected_roster)
-        self.number_workers_per_shift()
+        self.run_phase('one_worker_one_shift', self.one_worker_one_shift)
+        self.run_phase('number_off_day_per_worker_per_roster', self.number_off_day_per_worker_per_roster, params=[min_off_day, max_off_day])
+        self.run_phase('build_previous_roster', self.build_previous_roster)
+        self.run_phase('number_workers_per_shift', self.number_workers_per_shift)
         
-        self.match_worker_role_and_shift_hard()
+        self.run_phase('match_worker_role_and_shift_hard', self.match_worker_role_and_shift_hard)
         
-        self.implement_slot_sequence_constraints(duties_by_shift)
-        self.implement_sum_constraint()
-        self.generate_transition_rules_model(duties_by_shift)
+        self.run_phase('implement_slot_sequence_constraints', self.implement_slot_sequence_constraints, duties_by_shift)
+        self.run_phase('implement_sum_constraint', self.implement_sum_constraint)
+        self.run_phase('generate_transition_rules_model', self.generate_transition_rules_model, duties_by_shift)
 
         #initialize dictionary of function from jadual lib
         constraints_func = self.get_functions_dict()
 
         #iterate based on functions
         for constraint in constraints:
-            constraints_func[constraint["functionName"]]()
+            self.run_phase(constraint["functionName"], constraints_func[constraint["functionName"]])
         
         print('requests', include_requests)
         if include_requests:
-            self.populate_requests()
+            self.run_phase('populate_requests', self.populate_requests)
 
-        self.excess_covers()
-        self.minimize()
-        self.use_current_selected_roster(selected_roster)
-        self.solve()
-        self.check_feasibility()
+        self.run_phase('excess_covers', self.excess_covers)
+        self.run_phase('minimize', self.minimize)
+
+    def use_selected_roster_model(
+        self, 
+        constraints, 
+        duties_by_shift, 
+        min_off_day, 
+        max_off_day,
+        include_requests,
+        selected_roster = [], 
+        include_leaves = False, 
+        include_duties= False,
+        include_off_days = False, 
+        solver_profile = DEFAULT_SOLVER_PROFILE,
+        solver_parameters = None,
+        hint_roster = None,
+        hint_last_solution = False,
+        cache = None,
+        objective_stages = None,
+        stage_time_limit = None,
+        solution_pool_size = None,
+        min_hamming_distance = 0,
+        on_solution = None
+    ):
+        """this model takes a dynamic parameter of leaves and off days"""
+        print('using selected model')
+        if cache is not None:
+            digest = self.input_digest(
+                model='selected_roster',
+                constraints=constraints,
+                duties_by_shift=duties_by_shift,
+                min_off_day=min_off_day,
+                max_off_day=max_off_day,
+                include_requests=include_requests,
+                selected_roster=selected_roster,
+                include_leaves=include_leaves,
+                solver_profile=solver_profile,
+                solver_parameters=solver_parameters,
+                objective_stages=objective_stages,
+                stage_time_limit=stage_time_limit,
+            )
+            # the pool is not cached, a pooled solve always searches
+            if not solution_pool_size and self.restore_from_cache(cache, digest):
+                self.populate_solved_data(include_leaves)
+                return self.lambda_payload(include_leaves)
+        self.apply_solver_profile(solver_profile, solver_parameters)
+        self.build_selected_roster_model(
+            constraints,
+            duties_by_shift,
+            min_off_day,
+            max_off_day,
+            include_requests,
+            selected_roster,
+            include_leaves
+        )
+        self.add_solution_hints(hint_roster, hint_last_solution)
+        self.use_solution_pool(solution_pool_size, min_hamming_distance)
+        self.use_solution_stream(on_solution)
+        self.solve_staged(objective_stages, stage_time_limit)
+        if cache is not None:
+            self.store_in_cache(cache, digest)
         self.populate_solved_data(include_leaves)
 
-        return self.lambda_payload(include_leaves)
\ No newline at end of file
+        return self.lambda_payload(include_leaves)
@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+import time
+import tracemalloc
+import logging
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class PhaseStats:
+    """what a single model build phase cost and added to the model"""
+    name: str
+    wall_time: float = 0.0
+    peak_memory_delta: int = None
+    variables: int = 0
+    constraints: int = 0
+    objective_terms: int = 0
+    swallowed_exceptions: int = 0
+    swallowed: dict = field(default_factory=dict)
+
+
+class BuildProfiler():
+    """Records wall time, peak traced memory and model growth for each JadualModel build phase,
+    plus the exceptions swallowed by the try/except blocks inside each phase.
+    Memory is only measured while tracemalloc is tracing, either because the caller started it
+    or because trace_memory=True."""
+
+    def __init__(self, jadual, trace_memory=False):
+        self.jadual = jadual
+        self.trace_memory = trace_memory
+        self.phases = []
+        self.current = None
+        self.swallowed_outside_phases = {}
+
+    def counts(self):
+        proto = self.jadual.model.Proto()
+        objective_terms = len(self.jadual.obj_bool_vars_min) + len(self.jadual.obj_int_vars)
+        return len(proto.variables), len(proto.constraints), objective_terms
+
+    @contextmanager
+    def phase(self, name):
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # reset_peak is python 3.9+, before that the peak is the highest since tracing started
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            memory_before, peak_before = tracemalloc.get_traced_memory()
+
+        stats = PhaseStats(name)
+        parent, self.current = self.current, stats
+        variables, constraints, objective_terms = self.counts()
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.wall_time = time.perf_counter() - start
+            variables_after, constraints_after, objective_terms_after = self.counts()
+            stats.variables = variables_after - variables
+            stats.constraints = constraints_after - constraints
+            stats.objective_terms = objective_terms_after - objective_terms
+            if tracing:
+                memory_after, memory_peak = tracemalloc.get_traced_memory()
+                if memory_peak == peak_before:
+                    # no new peak during the phase, an older one may still be reported without reset_peak
+                    memory_peak = max(memory_after, memory_before)
+                stats.peak_memory_delta = memory_peak - memory_before
+            if started_tracing:
+                tracemalloc.stop()
+            self.current = parent
+            self.phases.append(stats)
+
+    def record_swallowed(self, exc, where):
+        key = f'{where}: {type(exc).__name__}'
+        swallowed = self.current.swallowed if self.current is not None else self.swallowed_outside_phases
+        swallowed[key] = swallowed.get(key, 0) + 1
+        if self.current is not None:
+            self.current.swallowed_exceptions += 1
+
+    def report(self):
+        """structured, JSON serialisable report of every phase and the totals"""
+        phases = [asdict(stats) for stats in self.phases]
+        totals = {
+            'wall_time': sum(stats.wall_time for stats in self.phases),
+            'variables': sum(stats.variables for stats in self.phases),
+            'constraints': sum(stats.constraints for stats in self.phases),
+            'objective_terms': sum(stats.objective_terms for stats in self.phases),
+            'swallowed_exceptions': sum(stats.swallowed_exceptions for stats in self.phases)
+                + sum(self.swallowed_outside_phases.values()),
+        }
+        return {'phases': phases, 'totals': totals, 'swallowed_outside_phases': dict(self.swallowed_outside_phases)}
+
+    def log_report(self):
+        for stats in self.phases:
+            log.info(
+                f'{stats.name}: {stats.wall_time:.3f}s, +{stats.variables} variables, '
+                f'+{stats.constraints} constraints, +{stats.objective_terms} objective terms, '
+                f'{stats.swallowed_exceptions} swallowed exceptions'
+            )
+
+
+def compare_reports(baseline, current):
+    """per phase difference (current - baseline) of two BuildProfiler reports, matched by phase name"""
+    keys = ('wall_time', 'variables', 'constraints', 'objective_terms', 'swallowed_exceptions')
+
+    def by_name(report):
+        totals = {}
+        for phase in report['phases']:
+            entry = totals.setdefault(phase['name'], dict.fromkeys(keys, 0))
+            for key in keys:
+                entry[key] += phase[key]
+        return totals
+
+    baseline_phases, current_phases = by_name(baseline), by_name(current)
+    diff = {}
+    for name in list(baseline_phases) + [n for n in current_phases if n not in baseline_phases]:
+        before = baseline_phases.get(name, dict.fromkeys(keys, 0))
+        after = current_phases.get(name, dict.fromkeys(keys, 0))
+        diff[name] = {key: after[key] - before[key] for key in keys}
+    return diff
@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+from utils.jadualortools import JadualModel, DEFAULT_SOLVER_PROFILE, to_date
+import json
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class WindowStats:
+    """one solved window: it covers start..end and its days up to commit_end are kept"""
+    start: object
+    end: object
+    commit_end: object
+    status: str
+    objective: float = None
+    build_time: float = 0.0
+    solve_time: float = 0.0
+
+
+@dataclass
+class RollingResult:
+    """merged outcome of a rolling horizon solve, payload in lambda_payload format"""
+    status: str
+    payload: str = '[]'
+    schedule_data: dict = field(default_factory=dict)
+    carried_totals: dict = field(default_factory=dict)
+    windows: list = field(default_factory=list)
+
+
+def rolling_windows(date_list, window_days=14, overlap_days=7):
+    """(window dates, committed dates) pairs. each window starts where the previous one stopped committing,
+    its last overlap_days are only look ahead and are solved again by the next window"""
+    if window_days <= overlap_days:
+        raise ValueError(f'window_days ({window_days}) must be larger than overlap_days ({overlap_days})')
+    step = window_days - overlap_days
+    windows = []
+    start = 0
+    while start < len(date_list):
+        window = date_list[start:start + window_days]
+        last = start + window_days >= len(date_list)
+        committed = window if last else window[:step]
+        windows.append((window, committed))
+        if last:
+            break
+        start += step
+    return windows
+
+
+def window_model_kwargs(model_kwargs, window, prior_timeslots, carried_totals, closes_horizon=True):
+    """JadualModel arguments restricted to the dates of one window, closes_horizon False for every window but the last"""
+    window_dates = set(window)
+    kwargs = dict(model_kwargs)
+    kwargs['date_list'] = list(window)
+    kwargs['duty_id_for_dates'] = {d: model_kwargs['duty_id_for_dates'][d] for d in window}
+    kwargs['leaves_id_for_dates'] = {d: model_kwargs['leaves_id_for_dates'][d] for d in window}
+    kwargs['off_day_date_list'] = [d for d in model_kwargs['off_day_date_list'] if d in window_dates]
+    window_days = {to_date(d) for d in window}
+    kwargs['requests_data'] = [r for r in model_kwargs['requests_data'] if to_date(r['date']) in window_days]
+    kwargs['prior_timeslots'] = prior_timeslots
+    kwargs['carried_totals'] = dict(carried_totals)
+    kwargs['closes_horizon'] = closes_horizon
+    return kwargs
+
+
+def committed_timeslots(jadual, committed):
+    """the committed days of a solved window as timeslots, the format build_previous_roster reads"""
+    result = jadual.result
+    timeslots = []
+    for d in committed:
+        start = to_date(d).isoformat()
+        for s in jadual.duty_id_for_dates[d]:
+            for w in result.assigned_workers(d, s):
+                timeslots.append({'workerId': w, 'start': start, 'type': 'Duty', 'dutyId': s})
+        for l in jadual.leaves_id_for_dates[d]:
+            for w in result.assigned_workers(d, l):
+                timeslots.append({'workerId': w, 'start': start, 'type': 'Leave', 'leaveId': l})
+    return timeslots
+
+
+def solve_rolling_horizon(
+    model_kwargs,
+    constraints,
+    duties_by_shift,
+    window_days = 14,
+    overlap_days = 7,
+    min_off_day = 0,
+    max_off_day = 1,
+    solver_profile = DEFAULT_SOLVER_PROFILE,
+    solver_parameters = None
+):
+    """Solve a long roster as a sequence of overlapping default_model windows.
+
+    The committed days of every window become prior timeslots of the next one, so
+    transition rules across the boundary are enforced by build_previous_roster exactly
+    as for the previous published roster, and the sequence constraints continue the run
+    each worker is on at the boundary (at most 14 days of it). Per (worker, slot)
+    assignment counts of the committed days are carried forward as running totals for
+    fairness_allocation and the MONTH sum constraints. A window before the last one only
+    sees a prefix of the month, so it enforces the MONTH maxima alone and keeps the
+    fairness spread small through the objective; the minima and the spread of at most 1
+    are enforced by the last window, which can fall short of them if the earlier windows
+    drifted too far. Weekly sums line up with the single model when the step
+    (window_days - overlap_days) is a multiple of 7. Every window has the same size, so
+    build and solve time grow linearly with the horizon.
+    """
+    date_list = list(model_kwargs['date_list'])
+    prior_timeslots = model_kwargs.get('prior_timeslots')
+    carried_totals = {}
+    outcome = RollingResult(status="OPTIMAL")
+    records = []
+
+    windows = rolling_windows(date_list, window_days, overlap_days)
+    for position, (window, committed) in enumerate(windows):
+        started = time.perf_counter()
+        closes_horizon = position == len(windows) - 1
+        jadual = JadualModel(**window_model_kwargs(model_kwargs, window, prior_timeslots, carried_totals, closes_horizon))
+        jadual.apply_solver_profile(solver_profile, solver_parameters)
+        jadual.build_default_model(constraints, duties_by_shift, min_off_day, max_off_day)
+        built = time.perf_counter()
+        result = jadual.solve()
+        stats = WindowStats(
+            start=window[0],
+            end=window[-1],
+            commit_end=committed[-1],
+            status=result.status,
+            objective=result.objective,
+            build_time=built - started,
+            solve_time=time.perf_counter() - built,
+        )
+        outcome.windows.append(stats)
+        log.info(f'rolling window {stats.start} - {stats.end}: {stats.status} in {stats.build_time + stats.solve_time:.2f}s')
+        if not result.has_solution:
+            outcome.status = result.status
+            break
+        if result.status != "OPTIMAL":
+            outcome.status = "FEASIBLE"
+
+        jadual.populate_solved_data()
+        committed_days = {to_date(d).isoformat() for d in committed}
+        records.extend(r for r in json.loads(jadual.lambda_payload()) if r['start'] in committed_days)
+        for d in committed:
+            outcome.schedule_data[d] = jadual.schedule_data.get(d, {})
+            for s, workers in outcome.schedule_data[d].items():
+                for w in workers:
+                    carried_totals[(w, s)] = carried_totals.get((w, s), 0) + 1
+
+        # the window's own prior timeslots were loaded (or queried) while building, keep them for the next window
+        prior_timeslots = list(jadual.prior_timeslots or []) + committed_timeslots(jadual, committed)
+
+    outcome.payload = json.dumps(records, separators=(',', ':'))
+    outcome.carried_totals = carried_totals
+    return outcome
@@ -0,0 +1,249 @@
+from utils.jadualortools import DEFAULT_SOLVER_PROFILE
+import logging
+
+log = logging.getLogger(__name__)
+
+REQUEST_WEIGHT = -50
+
+
+class JadualSession():
+    """Keeps a built JadualModel in memory between solves.
+
+    Requests, cover levels and fixed assignments are applied to the CP model
+    proto as deltas: fixed assignments are single literal constraints that are
+    relaxed in place when removed, request weights are objective coefficient
+    updates and cover levels rewrite the bounds of the existing coverage
+    constraints. A change therefore costs time proportional to the number of
+    literals it touches, and every re-solve is hinted with the previous solution.
+    """
+
+    def __init__(
+        self,
+        jadual,
+        constraints,
+        duties_by_shift,
+        min_off_day = 0,
+        max_off_day = 1,
+        selected_roster = [],
+        solver_profile = DEFAULT_SOLVER_PROFILE,
+        solver_parameters = None
+    ):
+        self.jadual = jadual
+        self.model = jadual.model
+        self.requests = {}
+        self.request_effects = {}
+        self.fixed = {}
+        self.free_fix_constraints = []
+
+        # build without requests, they are applied below as deltas so they can be withdrawn later
+        requests = jadual.requests
+        jadual.requests = []
+        jadual.apply_solver_profile(solver_profile, solver_parameters)
+        jadual.build_default_model(constraints, duties_by_shift, min_off_day, max_off_day, selected_roster)
+
+        objective = self.model.Proto().objective
+        self.objective_positions = {}
+        for position, var_index in enumerate(objective.vars):
+            self.objective_positions.setdefault(var_index, position)
+
+        for request in requests:
+            self.add_request(request)
+
+# ------------------------------------------------------------------------------------------------------------
+#  Literal level deltas
+# ------------------------------------------------------------------------------------------------------------
+
+    def add_objective_term(self, var_index, coeff):
+        objective = self.model.Proto().objective
+        if var_index in self.objective_positions:
+            position = self.objective_positions[var_index]
+            objective.coeffs[position] = objective.coeffs[position] + coeff
+        else:
+            self.objective_positions[var_index] = len(objective.vars)
+            objective.vars.append(var_index)
+            objective.coeffs.append(coeff)
+
+    def fix_literal(self, var_index, value):
+        """adds var == value, reusing a relaxed constraint slot if one is free. returns the constraint index"""
+        proto = self.model.Proto()
+        if self.free_fix_constraints:
+            ct_index = self.free_fix_constraints.pop()
+            linear = proto.constraints[ct_index].linear
+            linear.vars[0] = var_index
+            linear.domain[0] = value
+            linear.domain[1] = value
+        else:
+            ct_index = len(proto.constraints)
+            linear = proto.constraints.add().linear
+            linear.vars.append(var_index)
+            linear.coeffs.append(1)
+            linear.domain.extend([value, value])
+        return ct_index
+
+    def release_literal(self, ct_index):
+        """relaxes a constraint added by fix_literal to 0 <= var <= 1 and keeps the slot for reuse"""
+        linear = self.model.Proto().constraints[ct_index].linear
+        linear.domain[0] = 0
+        linear.domain[1] = 1
+        self.free_fix_constraints.append(ct_index)
+
+    def apply_effects(self, effects):
+        applied = []
+        for kind, var_index, value in effects:
+            if kind == 'fix':
+                applied.append(('fix', var_index, self.fix_literal(var_index, value)))
+            else:
+                self.add_objective_term(var_index, value)
+                applied.append(('objective', var_index, value))
+        return applied
+
+    def revert_effects(self, applied):
+        for kind, var_index, value in applied:
+            if kind == 'fix':
+                self.release_literal(value)
+            else:
+                self.add_objective_term(var_index, -value)
+
+# ------------------------------------------------------------------------------------------------------------
+#  Requests
+# ------------------------------------------------------------------------------------------------------------
+
+    def negate_effects(self, request, work):
+        """the fix of a NEGATE on a work term, nothing for a folded cell"""
+        if not isinstance(work, int):
+            return [('fix', work.Index(), 0)]
+        if work:
+            # populate_requests leaves a folded cell as it is, the request can not be met
+            log.warning(f'request {request.get("id")} negates an assignment fixed before the build')
+        return []
+
+    def reward_effects(self, work):
+        """the objective term of an AFFIRM on a work term, a folded 1 is rewarded through the constant literal"""
+        if not isinstance(work, int):
+            return [('objective', work.Index(), REQUEST_WEIGHT)]
+        if work:
+            return [('objective', self.jadual.constant_literal(1).Index(), REQUEST_WEIGHT)]
+        return []
+
+    def request_effects_for(self, request):
+        """the fixes and objective terms populate_requests would add for a single request"""
+        jadual = self.jadual
+        effects = []
+        requested_slots = []
+        if request['type'] != "Shift":
+            try:
+                worker, day, slot, request_type, strategy = jadual.parse_requests_to_model_format(request)
+            except Exception as e:
+                log.info(f'request {request.get("id")} could not be parsed: {e}')
+                return effects, requested_slots
+            work = jadual.request_term((worker, day, slot))
+            if work is None:
+                log.info(f'request {request.get("id")} is not in the model')
+                return effects, requested_slots
+            requested_slots.append((worker, day, slot))
+            if strategy == "NEGATE":
+                effects.extend(self.negate_effects(request, work))
+            else:
+                effects.extend(self.reward_effects(work))
+            return effects, requested_slots
+
+        duties, other_duties = jadual.parse_shift_requests_to_model_format(request)
+        if request["strategy"] == "AFFIRM":
+            off_day_negate = set()
+            for worker, day, slot, request_type, strategy in other_duties:
+                work = jadual.request_term((worker, day, slot))
+                if work is None:
+                    continue
+                effects.extend(self.negate_effects(request, work))
+                off_day = jadual.work.get((worker, day, jadual.off_day_id))
+                if off_day is not None and (worker, day) not in off_day_negate:
+                    effects.append(('fix', off_day.Index(), 0))
+                    off_day_negate.add((worker, day))
+        for worker, day, slot, request_type, strategy in duties:
+            work = jadual.request_term((worker, day, slot))
+            if work is None:
+                continue
+            if strategy == "NEGATE":
+                effects.extend(self.negate_effects(request, work))
+            else:
+                effects.extend(self.reward_effects(work))
+        return effects, requested_slots
+
+    def add_request(self, request):
+        request_id = request["id"]
+        if request_id in self.requests:
+            self.remove_request(request_id)
+        effects, requested_slots = self.request_effects_for(request)
+        self.requests[request_id] = request
+        self.request_effects[request_id] = (self.apply_effects(effects), requested_slots)
+        self.jadual.requests.append(request)
+        self.jadual.request_list.extend(requested_slots)
+
+    def remove_request(self, request_id):
+        request = self.requests.pop(request_id)
+        applied, requested_slots = self.request_effects.pop(request_id)
+        self.revert_effects(applied)
+        self.jadual.requests.remove(request)
+        for slot in requested_slots:
+            self.jadual.request_list.remove(slot)
+
+    def update_request(self, request):
+        """replace the request with the same id"""
+        self.add_request(request)
+
+# ------------------------------------------------------------------------------------------------------------
+#  Covers and fixed assignments
+# ------------------------------------------------------------------------------------------------------------
+
+    def set_cover(self, d, s, min_staff, max_staff):
+        """change the min/max staff of duty s on date d"""
+        proto = self.model.Proto()
+        min_ct, max_ct = self.jadual.cover_constraints[(d, s)]
+        # the workers folded to s are a constant of the cover, the proto bounds only count the literals
+        grid = self.jadual.work
+        _, constant = grid.cover_terms(grid.date_index[d], grid.slot_index[s])
+        proto.constraints[min_ct.Index()].linear.domain[0] = min_staff - constant
+        proto.constraints[max_ct.Index()].linear.domain[1] = max_staff - constant
+        if (d, s) in self.jadual.excess_cover_constraints:
+            worked, excess, excess_ct = self.jadual.excess_cover_constraints[(d, s)]
+            num_workers = len(self.jadual.workers_list)
+            proto.variables[worked.Index()].domain[0] = min_staff
+            proto.variables[excess.Index()].domain[1] = max(num_workers - min_staff, 0)
+            excess_linear = proto.constraints[excess_ct.Index()].linear
+            excess_linear.domain[0] = min_staff
+            excess_linear.domain[1] = min_staff
+        duty_index = self.jadual.get_duty_index()
+        duty_index.staff[(d, s)] = (min_staff, max_staff)
+
+    def fix(self, w, d, s, value):
+        """force work literal (w, d, s) to value until unfix is called. a cell folded before the build, e.g. a
+        duty the worker's role can not take, already has its value and raises ValueError if fixed to another"""
+        self.unfix(w, d, s)
+        work = self.jadual.request_term((w, d, s))
+        if work is None:
+            raise KeyError(f'work_{w}_{d}_{s} is not in the model')
+        if isinstance(work, int):
+            if work != value:
+                raise ValueError(f'work_{w}_{d}_{s} is fixed to {work} before the build, it can not be fixed to {value}')
+            return
+        self.fixed[(w, d, s)] = self.fix_literal(work.Index(), value)
+
+    def unfix(self, w, d, s):
+        if (w, d, s) in self.fixed:
+            self.release_literal(self.fixed.pop((w, d, s)))
+
+# ------------------------------------------------------------------------------------------------------------
+#  Solve
+# ------------------------------------------------------------------------------------------------------------
+
+    def solve(self, include_leaves=True):
+        """re-solve hinted with the previous solution and return the lambda payload"""
+        jadual = self.jadual
+        previous = jadual.result
+        if previous is not None and previous.has_solution:
+            jadual.set_solution_hints(jadual.hint_values_from_result(previous), "previous_solve")
+        jadual.result = None
+        jadual.schedule_data = {}
+        jadual.solve()
+        jadual.populate_solved_data(include_leaves)
+        return jadual.lambda_payload(include_leaves)
@@ -0,0 +1,31 @@
+import pytest
+from utils.jadualortools import JadualModel
+from utils.jadualbatch import RosterJob, solve_batch, split_cores
+
+
+def test_split_cores():
+    assert split_cores(10, None, 8) == (8, 1)
+    assert split_cores(10, 2, 8) == (2, 4)
+    assert split_cores(1, None, 8) == (1, 8)
+    assert split_cores(0, None, 8) == (1, 8)
+
+
+def test_solve_batch_checks_arguments_when_called():
+    with pytest.raises(ValueError):
+        solve_batch([], executor='fork')
+    with pytest.raises(ValueError):
+        solve_batch([], max_concurrent=0)
+    assert list(solve_batch([], executor='thread')) == []
+
+
+def test_batch_matches_single_solves(make_tenant):
+    jobs, expected = [], {}
+    for seed in (0, 1):
+        kwargs, duties_by_shift = make_tenant(seed=seed)
+        jadual = JadualModel(**kwargs)
+        jadual.default_model([], duties_by_shift)
+        expected[str(seed)] = (jadual.result.status, jadual.result.objective)
+        jobs.append(RosterJob(str(seed), kwargs, method_kwargs={'constraints': [], 'duties_by_shift': duties_by_shift}))
+    outcomes = {outcome.job_id: outcome for outcome in solve_batch(jobs, total_cores=2, executor='thread')}
+    assert {job_id: (o.status, o.objective) for job_id, o in outcomes.items()} == expected
+    assert all(o.error is None and o.num_search_workers == 1 for o in outcomes.values())
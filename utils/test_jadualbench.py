@@ -0,0 +1,34 @@
+from utils.jadualbench import write_baseline, compare_to_baseline
+
+
+def bench_row(objective, solve_time=1.0):
+    return {
+        'num_workers': 25,
+        'num_days': 14,
+        'build_time': 1.0,
+        'variables': 100,
+        'constraints': 200,
+        'first_solution_time': 0.5,
+        'solve_time': solve_time,
+        'payload_time': None,
+        'objective': objective,
+    }
+
+
+def test_compare_to_baseline(tmp_path):
+    path = tmp_path / 'baseline.json'
+    write_baseline([bench_row(10)], path)
+    assert compare_to_baseline([bench_row(10)], path) == []
+    assert compare_to_baseline([bench_row(9, solve_time=1.1)], path) == []
+    assert compare_to_baseline([bench_row(None)], path) == [(25, 14, 'objective', 10, None)]
+    assert compare_to_baseline([bench_row(11, solve_time=2.0)], path) == [
+        (25, 14, 'solve_time', 1.0, 2.0),
+        (25, 14, 'objective', 10, 11),
+    ]
+
+
+def test_compare_to_unsolved_baseline(tmp_path):
+    path = tmp_path / 'baseline.json'
+    write_baseline([bench_row(None)], path)
+    assert compare_to_baseline([bench_row(None)], path) == []
+    assert compare_to_baseline([bench_row(10)], path) == []
@@ -0,0 +1,38 @@
+import json
+from utils.jadualcache import RosterCache
+from utils.jadualortools import JadualModel
+
+
+def test_cache_hit_matches_fresh_solve(make_tenant, tmp_path):
+    cache = RosterCache(str(tmp_path))
+    kwargs, duties_by_shift = make_tenant()
+    fresh = JadualModel(**kwargs)
+    payload = fresh.default_model([], duties_by_shift, cache=cache)
+    assert len(cache.entries()) == 1
+
+    cached = JadualModel(**kwargs)
+    cached_payload = cached.default_model([], duties_by_shift, cache=cache)
+    # restored without building the model
+    assert not cached.model.Proto().variables
+    assert cached.result.status == fresh.result.status
+    assert cached.result.objective == fresh.result.objective
+    assert json.loads(cached_payload) == json.loads(payload)
+
+
+def test_cache_miss_on_changed_inputs(make_tenant, tmp_path):
+    cache = RosterCache(str(tmp_path))
+    kwargs, duties_by_shift = make_tenant()
+    JadualModel(**kwargs).default_model([], duties_by_shift, cache=cache)
+    changed = JadualModel(**dict(kwargs, requests_data=kwargs['requests_data'][1:]))
+    changed.default_model([], duties_by_shift, cache=cache)
+    assert changed.model.Proto().variables
+    assert len(cache.entries()) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = RosterCache(str(tmp_path), max_bytes=0)
+    for digest in ('a', 'b'):
+        with open(cache.paths(digest)[1], 'w') as f:
+            json.dump({'result': {}}, f)
+    cache.evict()
+    assert cache.entries() == []
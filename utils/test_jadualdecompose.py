@@ -0,0 +1,32 @@
+import json
+from utils.jadualortools import JadualModel
+from utils.jadualdecompose import solve_by_components, worker_components
+
+
+def test_worker_components(make_tenant):
+    kwargs, _ = make_tenant(num_workers=12)
+    components = worker_components(JadualModel(**kwargs))
+    # every worker holds a single role and every duty belongs to one role
+    assert sorted(sorted(c.workers) for c in components) == [
+        sorted(f'worker_{w}' for w in range(0, 12, 2)),
+        sorted(f'worker_{w}' for w in range(1, 12, 2)),
+    ]
+    assert all(len({d.split('_', 2)[2] for d in c.duties}) == 1 for c in components)
+
+
+def test_components_match_whole_model(make_tenant):
+    kwargs, duties_by_shift = make_tenant(num_workers=12)
+    whole = JadualModel(**kwargs)
+    whole.default_model([], duties_by_shift)
+    decomposed = solve_by_components(kwargs, [], duties_by_shift, total_cores=2, executor='thread')
+    assert len(decomposed.components) == 2
+    assert whole.result.status == decomposed.status == 'OPTIMAL'
+    assert decomposed.result.objective == whole.result.objective
+    assert len(json.loads(decomposed.payload)) == len(json.loads(whole.lambda_payload()))
+
+
+def test_coupled_tenant_is_solved_whole(make_tenant):
+    kwargs, duties_by_shift = make_tenant(num_workers=12)
+    constraints = [{'functionName': 'fairness_allocation'}]
+    decomposed = solve_by_components(kwargs, constraints, duties_by_shift, total_cores=2, executor='thread')
+    assert len(decomposed.components) == 1
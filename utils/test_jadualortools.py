@@ -0,0 +1,106 @@
+import itertools
+import pytest
+from ortools.sat.python import cp_model
+from utils.jadualortools import SEQUENCE_ENCODINGS, JadualModel, SolveResult
+from utils.jadualbench import synthetic_tenant
+
+
+def sequence_cost(encoding, values, bounds):
+    """smallest penalty of the sequence constraint for the fixed series values, None if it is infeasible"""
+    model = cp_model.CpModel()
+    works = [model.NewBoolVar(f'work({t})') for t in range(len(values))]
+    for work, value in zip(works, values):
+        model.Add(work == value)
+    variables, coeffs = SEQUENCE_ENCODINGS[encoding](model, works, *bounds, 'test')
+    model.Minimize(sum(coeff * variable for variable, coeff in zip(variables, coeffs)))
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = 1
+    status = solver.Solve(model)
+    if status == cp_model.INFEASIBLE:
+        return None
+    assert status == cp_model.OPTIMAL
+    return round(solver.ObjectiveValue())
+
+
+def zero_length_spans(values):
+    """the empty spans SPAN penalizes when hard_min is 0: a false first or last value and every pair of false neighbours"""
+    pairs = sum(1 for a, b in zip(values, values[1:]) if not a and not b)
+    return (not values[0]) + (not values[-1]) + pairs
+
+
+def sequence_bounds():
+    """(hard_min, soft_min, min_cost, soft_max, hard_max, max_cost) for every ordering of the limits up to 4"""
+    for hard_min, soft_min, soft_max, hard_max in itertools.combinations_with_replacement(range(5), 4):
+        if hard_max == 0:
+            continue
+        yield hard_min, soft_min, 2, soft_max, hard_max, 3
+    yield 0, 2, 0, 2, 3, 0
+
+
+@pytest.mark.parametrize('bounds', list(sequence_bounds()))
+def test_sequence_encodings_agree(bounds):
+    hard_min, soft_min, min_cost = bounds[:3]
+    for values in itertools.product((0, 1), repeat=5):
+        span = sequence_cost('SPAN', values, bounds)
+        run_length = sequence_cost('RUN_LENGTH', values, bounds)
+        if span is None or run_length is None:
+            assert span == run_length, values
+            continue
+        if hard_min == 0 and min_cost > 0:
+            # SPAN also counts the empty spans, RUN_LENGTH only real streaks
+            run_length += min_cost * soft_min * zero_length_spans(values)
+        assert span == run_length, values
+
+
+def model_with_folded_cells(workers, duty='S_AM_role_0', day=3):
+    """synthetic tenant (at most 1 worker per duty) with the cells of workers on duty folded to 1 before the build"""
+    kwargs, duties_by_shift, duty_index = synthetic_tenant(10, 7)
+    jadual = JadualModel(**kwargs)
+    jadual.duty_index = duty_index
+    grid = jadual.work
+    d = jadual.date_list[day]
+    for w in workers:
+        jadual.fixed_assignments[(grid.worker_index[w], grid.date_index[d], grid.slot_index[duty])] = {1}
+    jadual.build_default_model([], duties_by_shift, min_off_day=0, max_off_day=2)
+    return jadual, d
+
+
+def test_cover_counts_folded_cells():
+    jadual, d = model_with_folded_cells(['worker_0'])
+    result = jadual.solve()
+    assert result.status == 'OPTIMAL'
+    assert list(result.assigned_workers(d, 'S_AM_role_0')) == ['worker_0']
+
+    jadual, d = model_with_folded_cells(['worker_0', 'worker_2'])
+    assert jadual.solve().status == 'INFEASIBLE'
+
+
+def test_negate_request_is_folded(make_tenant):
+    kwargs, duties_by_shift = make_tenant()
+    d = kwargs['date_list'][2]
+    kwargs['requests_data'] = [{'id': 'request_0', 'workerId': 'worker_0', 'date': d.isoformat(),
+                                'strategy': 'NEGATE', 'type': 'Duty', 'dutyId': 'S_AM_role_0'}]
+    jadual = JadualModel(**kwargs)
+    jadual.build_default_model([], duties_by_shift, min_off_day=0, max_off_day=2)
+    # no literal, the cell is the constant 0
+    assert jadual.request_term(('worker_0', d, 'S_AM_role_0')) == 0
+    # worker_0 holds role_0 only, its role_1 duties are folded as well
+    assert jadual.request_term(('worker_0', d, 'S_AM_role_1')) == 0
+    result = jadual.solve()
+    assert result.status == 'OPTIMAL'
+    assert 'worker_0' not in result.assigned_workers(d, 'S_AM_role_0')
+
+
+def test_dense_assignment_matches_solver(make_tenant):
+    kwargs, duties_by_shift = make_tenant()
+    jadual = JadualModel(**kwargs)
+    jadual.build_default_model([], duties_by_shift, min_off_day=0, max_off_day=2)
+    result = jadual.solve()
+    grid = jadual.work
+    for wi, di, si in zip(*grid.nonzero()):
+        assert result.assignment[wi, di, si] == jadual.solver.BooleanValue(grid.literals[wi, di, si])
+    # folded cells keep their constant, cells the model never had stay -1
+    assert (result.assignment[~grid.mask] == grid.fixed[~grid.mask]).all()
+    # the JSON record of a cached result restores the same array
+    restored = SolveResult.from_record(result.to_record(), result.dates)
+    assert (restored.assignment == result.assignment).all()
@@ -0,0 +1,36 @@
+import datetime
+import pytest
+from utils.jadualrolling import rolling_windows, solve_rolling_horizon
+
+
+def test_rolling_windows():
+    windows = rolling_windows(list(range(30)), 14, 7)
+    assert [(w[0], w[-1], c[-1]) for w, c in windows] == [(0, 13, 6), (7, 20, 13), (14, 27, 20), (21, 29, 29)]
+    with pytest.raises(ValueError):
+        rolling_windows(list(range(30)), 7, 7)
+
+
+def test_rolling_horizon_keeps_rules_across_windows(make_tenant):
+    kwargs, duties_by_shift = make_tenant(num_workers=12, num_days=21)
+    date_list = kwargs['date_list']
+    rolled = solve_rolling_horizon(kwargs, [], duties_by_shift, window_days=14, overlap_days=7, max_off_day=2)
+    assert rolled.status == 'OPTIMAL'
+    assert [w.commit_end for w in rolled.windows] == [date_list[6], date_list[20]]
+    assert sorted(rolled.schedule_data) == date_list
+
+    shift_of = {duty: shift for shift, duties in duties_by_shift.items() for duty in duties}
+    shifts = {}
+    for d, slots in rolled.schedule_data.items():
+        for s, workers in slots.items():
+            for w in workers:
+                if s in shift_of:
+                    shifts[(w, d)] = shift_of[s]
+    one_day = datetime.timedelta(days=1)
+    for (w, d), shift in shifts.items():
+        # the synthetic ward never has S_N followed by S_AM and allows at most 4 nights in a row
+        if shift == 'S_N':
+            assert shifts.get((w, d + one_day)) != 'S_AM'
+            assert any(shifts.get((w, d + n * one_day)) != 'S_N' for n in range(1, 5))
+
+    carried = sum(rolled.carried_totals.values())
+    assert carried == sum(len(workers) for slots in rolled.schedule_data.values() for workers in slots.values())
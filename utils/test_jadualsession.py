@@ -0,0 +1,51 @@
+import pytest
+from utils.jadualortools import JadualModel
+from utils.jadualsession import JadualSession
+
+
+def fresh_objective(kwargs, duties_by_shift):
+    jadual = JadualModel(**kwargs)
+    jadual.build_default_model([], duties_by_shift, 0, 2)
+    result = jadual.solve()
+    assert result.status == 'OPTIMAL'
+    return result.objective
+
+
+def test_request_edits_match_fresh_build(make_tenant):
+    kwargs, duties_by_shift = make_tenant()
+    requests = kwargs['requests_data']
+    session = JadualSession(JadualModel(**dict(kwargs, requests_data=requests[1:])), [], duties_by_shift, 0, 2)
+    session.add_request(requests[0])
+    session.remove_request(requests[1]['id'])
+    session.solve()
+    assert session.jadual.result.status == 'OPTIMAL'
+
+    edited = requests[:1] + requests[2:]
+    assert session.jadual.result.objective == fresh_objective(dict(kwargs, requests_data=edited), duties_by_shift)
+
+
+def test_cover_edit_matches_fresh_build(make_tenant):
+    kwargs, duties_by_shift = make_tenant(num_workers=20)
+    d, s = kwargs['date_list'][3], 'S_PM_role_1'
+    session = JadualSession(JadualModel(**kwargs), [], duties_by_shift, 0, 2)
+    session.set_cover(d, s, 3, 3)
+    session.solve()
+    assert len(session.jadual.result.assigned_workers(d, s)) == 3
+
+    df = kwargs['df'].copy()
+    row = (df['date'] == d) & (df['id'] == s)
+    df.loc[row, 'min_staff'] = 3
+    df.loc[row, 'max_staff'] = 3
+    assert session.jadual.result.objective == fresh_objective(dict(kwargs, df=df), duties_by_shift)
+
+
+def test_fix_folded_cell(make_tenant):
+    kwargs, duties_by_shift = make_tenant()
+    session = JadualSession(JadualModel(**kwargs), [], duties_by_shift, 0, 2)
+    # worker_0 holds role_0, the role_1 duties are folded to 0
+    d = kwargs['date_list'][0]
+    session.fix('worker_0', d, 'S_AM_role_1', 0)
+    with pytest.raises(ValueError):
+        session.fix('worker_0', d, 'S_AM_role_1', 1)
+    with pytest.raises(KeyError):
+        session.fix('worker_0', d, 'UNKNOWN', 1)